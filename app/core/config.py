@@ -1,15 +1,166 @@
 # config.py
 # app/core/config.py
+from functools import lru_cache
 from pydantic import field_validator
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Any, Dict, Optional
 
 class Settings(BaseSettings):
     APP_NAME: str = "SUEPR Legal AI"
     DEBUG: bool = True
     GROQ_API_KEY: str
+    # Override the Groq API origin, e.g. to point at benchmarks/fake_groq.py
+    GROQ_BASE_URL: Optional[str] = None
     MAX_FILE_SIZE: int = 10485760
 
+    # Shared LLM connection pool
+    GROQ_MAX_CONNECTIONS: int = 100
+    GROQ_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    GROQ_KEEPALIVE_EXPIRY: float = 30.0
+    GROQ_TIMEOUT: float = 60.0
+    GROQ_CONNECT_TIMEOUT: float = 5.0
+    GROQ_MAX_RETRIES: int = 4
+    # Bound on one call's attempts and retry backoff together
+    GROQ_TOTAL_TIMEOUT: float = 90.0
+    GROQ_MAX_CONCURRENCY: int = 16
+
+    # Outbound rate-limit budgets (set to the account's quota). These, the
+    # concurrency cap and the pool sizes below are service-wide totals that
+    # app.core.server splits evenly between its workers
+    GROQ_REQUESTS_PER_MINUTE: int = 30
+    GROQ_TOKENS_PER_MINUTE: int = 30000
+    GROQ_RETRY_BASE_DELAY: float = 0.5
+    GROQ_RETRY_MAX_DELAY: float = 20.0
+
+    # Model routing per task profile (classify, summarize, analyze, generate).
+    # JSON overrides of the defaults in model_router, e.g.
+    # MODEL_ROUTES='{"analyze": {"model": "llama3-8b-8192", "slo_seconds": 10}}'
+    MODEL_ROUTES: Dict[str, Dict[str, Any]] = {}
+    # How long a rate-limited primary model is skipped when no retry-after is sent
+    MODEL_ROUTER_COOLDOWN: float = 30.0
+
+    # Extraction executors
+    EXTRACTION_PROCESS_WORKERS: int = 2
+    EXTRACTION_THREAD_WORKERS: int = 4
+    EXTRACTION_TIMEOUT: float = 120.0
+
+    # Batch uploads
+    BATCH_MAX_FILES: int = 20
+    BATCH_MAX_CONCURRENCY: int = 4
+    BATCH_SUMMARY_CHARS_PER_DOC: int = 3000
+
+    # Long-document analysis (token estimates; llama3-8b-8192 has an 8192-token context)
+    CHUNK_SINGLE_PASS_TOKENS: int = 5500
+    CHUNK_MAX_TOKENS: int = 3000
+    CHUNK_MAP_MAX_TOKENS: int = 600
+    CHUNK_MAX_CONCURRENCY: int = 4
+
+    # Background jobs
+    JOBS_DB_PATH: str = "cache/jobs.sqlite3"
+    JOBS_WORKERS: int = 4
+    JOBS_MAX_QUEUE: int = 500
+    JOBS_RESULT_TTL: float = 86400.0
+    # On shutdown, how long running jobs get to finish before they are re-queued
+    JOBS_DRAIN_TIMEOUT: float = 20.0
+
+    # PDF extraction
+    PDF_MAX_PAGES: int = 500
+    PDF_TIME_BUDGET: float = 90.0
+    PDF_DEADLINE_GRACE: float = 15.0
+    PDF_MIN_PAGES_PER_JOB: int = 8
+    PDF_OCR_FALLBACK: bool = True
+    PDF_MIN_TEXT_CHARS: int = 10
+
+    # OCR
+    OCR_LANG: str = "eng"
+    OCR_TARGET_DPI: int = 300
+    OCR_BINARIZE: bool = True
+    OCR_PERSISTENT_ENGINE: bool = True
+
+    # Extracted-text cache (kept outside the publicly served uploads/ tree)
+    EXTRACTION_CACHE_DIR: str = "cache/extraction"
+    EXTRACTION_CACHE_MEMORY_ITEMS: int = 256
+    EXTRACTION_CACHE_MAX_BYTES: int = 536870912
+
+    # Startup warm-up, comma-separated: llm (open the API connection pool),
+    # extractors (import parsers in the worker processes), ocr, docx.
+    # A job-only worker might use "llm,extractors,ocr"; "" skips warm-up.
+    WARMUP_TASKS: str = "llm,extractors,ocr,docx"
+    WARMUP_TIMEOUT: float = 30.0
+
+    # Prometheus metrics at /metrics
+    METRICS_ENABLED: bool = True
+
+    # Generated-document store (served through the download route, not StaticFiles)
+    DOCUMENT_STORE_DIR: str = "storage/documents"
+    DOCUMENT_STORE_TTL: float = 604800.0
+    DOCUMENT_STORE_MAX_BYTES: int = 2147483648
+    DOCUMENT_STORE_SWEEP_INTERVAL: float = 600.0
+    UPLOAD_TEMP_DIR: str = "uploads/temp"
+    UPLOAD_TEMP_TTL: float = 3600.0
+
+    # LLM completion cache
+    COMPLETION_CACHE_ENABLED: bool = True
+    COMPLETION_CACHE_TTL: float = 3600.0
+    COMPLETION_CACHE_MEMORY_ITEMS: int = 1024
+    # Calls sampled above this temperature are never cached; the default
+    # covers the classify, summarize and analyze profiles but not generate
+    COMPLETION_CACHE_MAX_TEMPERATURE: float = 0.3
+    COMPLETION_CACHE_SQLITE_PATH: Optional[str] = None
+    COMPLETION_CACHE_SQLITE_MAX_ROWS: int = 50000
+    # Per-call-site TTLs in seconds; 0 disables caching for that call site
+    COMPLETION_CACHE_TTL_DOCUMENT: float = 86400.0
+    COMPLETION_CACHE_TTL_SUMMARY: float = 3600.0
+    COMPLETION_CACHE_TTL_CASE: float = 600.0
+    COMPLETION_CACHE_TTL_GENERATE: float = 0.0
+
+    # Case store: documents, analyses and conversation history per case_id
+    CASE_STORE_PATH: str = "storage/cases.sqlite3"
+    CASE_STORE_MEMORY_ITEMS: int = 128
+    CASE_STORE_TTL: float = 2592000.0
+    CASE_HISTORY_MESSAGES: int = 6
+
+    # Passage retrieval over case documents for prompt assembly
+    RETRIEVAL_PASSAGE_TOKENS: int = 200
+    RETRIEVAL_PROMPT_TOKENS: int = 2500
+    RETRIEVAL_INDEX_ITEMS: int = 128
+
+    # Structured LLM output: follow-up calls for missing required fields
+    STRUCTURED_OUTPUT_REPAIR_ATTEMPTS: int = 1
+    STRUCTURED_OUTPUT_REPAIR_MAX_TOKENS: int = 1000
+
+    # Response encoding: gzip (or brotli, when installed) above the minimum size
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Extracted text in upload responses: preview length and paging size
+    TEXT_PREVIEW_CHARS: int = 2000
+    TEXT_PAGE_CHARS: int = 20000
+
+    # Admission control on the expensive routes (ai_case, upload_doc,
+    # upload_batch, doc_generate), per worker process. JSON overrides of the
+    # defaults in admission, e.g.
+    # ADMISSION_LIMITS='{"ai_case": {"max_concurrency": 8, "max_queue": 8, "queue_timeout": 5}}'
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_LIMITS: Dict[str, Dict[str, Any]] = {}
+
+    # Production server (python -m app.core.server). 0 workers means one per core;
+    # each worker recycles after about SERVER_MAX_REQUESTS requests and, on
+    # shutdown, gives in-flight requests SERVER_GRACEFUL_TIMEOUT seconds and
+    # running jobs JOBS_DRAIN_TIMEOUT seconds
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0
+    SERVER_PRELOAD: bool = True
+    SERVER_MAX_REQUESTS: int = 2000
+    SERVER_MAX_REQUESTS_JITTER: int = 200
+    SERVER_GRACEFUL_TIMEOUT: float = 30.0
+    # A worker silent this long (startup warm-up included) is killed and replaced
+    SERVER_WORKER_TIMEOUT: float = 180.0
+    SERVER_KEEPALIVE: int = 5
+
     @field_validator('MAX_FILE_SIZE', mode='before')
     @classmethod
     def clean_max_file_size(cls, v):
@@ -20,4 +171,34 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
 
-settings = Settings()
\ No newline at end of file
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+class _LazySettings:
+    """Reads settings from the environment on first use rather than at import"""
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+settings = _LazySettings()
+
+class Lazy:
+    """Module-level singleton built on first use, so importing its module does not read settings"""
+
+    __slots__ = ("_factory", "_instance")
+
+    def __init__(self, factory):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+
+    def _get(self):
+        if self._instance is None:
+            object.__setattr__(self, "_instance", self._factory())
+        return self._instance
+
+    def __getattr__(self, name: str):
+        return getattr(self._get(), name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(self._get(), name, value)
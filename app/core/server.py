@@ -0,0 +1,177 @@
+# server.py
+# app/core/server.py
+"""Production entrypoint: ``python -m app.core.server``.
+
+Runs the app under gunicorn with one uvicorn worker per core (uvloop and
+httptools when installed). The app is imported once in the master so
+workers share its memory, each worker is recycled after about
+``SERVER_MAX_REQUESTS`` requests, and on SIGTERM workers stop accepting
+connections, give in-flight requests ``SERVER_GRACEFUL_TIMEOUT`` seconds
+and running jobs ``JOBS_DRAIN_TIMEOUT`` seconds, then exit. Without
+gunicorn (e.g. on Windows) it falls back to uvicorn's own process manager,
+which cannot recycle workers.
+
+Rate limits, the LLM concurrency cap and the background pools are held per
+process, so the configured values are service-wide totals that each worker
+gets an equal share of (``SHARED_SETTINGS``).
+"""
+import os
+from typing import Any, Dict
+
+from app.core.config import get_settings, settings
+
+try:
+    from gunicorn.app.base import BaseApplication
+    from uvicorn.workers import UvicornWorker
+except ImportError:  # gunicorn does not run on Windows
+    BaseApplication = None
+    UvicornWorker = None
+
+APP = "main:app"
+# Time the lifespan shutdown gets after the request and job drains
+SHUTDOWN_MARGIN = 10.0
+# Service-wide budgets split evenly between the workers (at least 1 each)
+SHARED_SETTINGS = (
+    "GROQ_REQUESTS_PER_MINUTE",
+    "GROQ_TOKENS_PER_MINUTE",
+    "GROQ_MAX_CONCURRENCY",
+    "EXTRACTION_PROCESS_WORKERS",
+    "EXTRACTION_THREAD_WORKERS",
+    "JOBS_WORKERS",
+)
+
+
+def worker_count() -> int:
+    return settings.SERVER_WORKERS or os.cpu_count() or 1
+
+
+def worker_share(workers: int) -> Dict[str, int]:
+    """One worker's part of each of the SHARED_SETTINGS"""
+    return {name: max(1, getattr(settings, name) // workers) for name in SHARED_SETTINGS}
+
+
+if UvicornWorker is not None:
+    class Worker(UvicornWorker):
+        """Uvicorn worker that bounds the wait for in-flight requests on shutdown"""
+
+        CONFIG_KWARGS = {"loop": "auto", "http": "auto", "lifespan": "on"}
+
+        def __init__(self, *args: Any, **kwargs: Any):
+            super().__init__(*args, **kwargs)
+            self.config.timeout_graceful_shutdown = settings.SERVER_GRACEFUL_TIMEOUT
+
+
+def _job_store():
+    from app.services.jobs.jobs_service import job_queue
+
+    return job_queue.store
+
+
+def on_starting(server) -> None:
+    # No worker is running yet, so any job marked running was interrupted
+    store = _job_store()
+    requeued = store.requeue()
+    # Workers must not inherit the master's SQLite connection
+    store.close()
+    if requeued:
+        server.log.info("Re-queued %d interrupted job(s)", requeued)
+
+
+def when_ready(server) -> None:
+    if settings.SERVER_PRELOAD:
+        from app.services.shared.warmup import warm_up
+
+        warm_up.preload()
+
+
+def pre_fork(server, worker) -> None:
+    # Give each worker the lowest slot not held by a live sibling, so a
+    # recycled worker takes over its predecessor's metrics series
+    taken = {getattr(sibling, "slot", None) for sibling in server.WORKERS.values()}
+    worker.slot = next(slot for slot in range(len(taken) + 1) if slot not in taken)
+
+
+def post_fork(server, worker) -> None:
+    from app.services.jobs.jobs_service import job_queue
+    from app.services.shared.metrics import metrics
+
+    # Nothing in the worker has read these yet; the rate limiter, LLM
+    # semaphore and pools are all built on first use
+    current = get_settings()
+    for name, value in worker_share(server.cfg.workers).items():
+        setattr(current, name, value)
+    metrics.set_worker(str(worker.slot))
+    # The master re-queues a worker's jobs when it exits (below); a worker
+    # starting up must leave its siblings' running jobs alone
+    job_queue.requeue_on_startup = False
+
+
+def child_exit(server, worker) -> None:
+    store = _job_store()
+    requeued = store.requeue(worker.pid)
+    store.close()
+    if requeued:
+        server.log.info("Re-queued %d job(s) from worker %s", requeued, worker.pid)
+
+
+def gunicorn_options() -> Dict[str, Any]:
+    return {
+        "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+        "workers": worker_count(),
+        "worker_class": "app.core.server.Worker",
+        "preload_app": settings.SERVER_PRELOAD,
+        "max_requests": settings.SERVER_MAX_REQUESTS,
+        "max_requests_jitter": settings.SERVER_MAX_REQUESTS_JITTER,
+        "graceful_timeout": int(settings.SERVER_GRACEFUL_TIMEOUT + settings.JOBS_DRAIN_TIMEOUT + SHUTDOWN_MARGIN),
+        "timeout": int(settings.SERVER_WORKER_TIMEOUT),
+        "keepalive": settings.SERVER_KEEPALIVE,
+        "on_starting": on_starting,
+        "when_ready": when_ready,
+        "pre_fork": pre_fork,
+        "post_fork": post_fork,
+        "child_exit": child_exit,
+    }
+
+
+if BaseApplication is not None:
+    class Server(BaseApplication):
+        def __init__(self, options: Dict[str, Any]):
+            self.options = options
+            super().__init__()
+
+        def load_config(self) -> None:
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+
+            return app
+
+
+def run() -> None:
+    if BaseApplication is not None:
+        Server(gunicorn_options()).run()
+        return
+
+    import uvicorn
+
+    print("gunicorn is not installed; running without worker recycling")
+    workers = worker_count()
+    if workers > 1:
+        # uvicorn spawns fresh interpreters, which read these from the environment
+        os.environ.update({name: str(value) for name, value in worker_share(workers).items()})
+    uvicorn.run(
+        APP,
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=workers,
+        loop="auto",
+        http="auto",
+        timeout_keep_alive=settings.SERVER_KEEPALIVE,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+    )
+
+
+if __name__ == "__main__":
+    run()
@@ -1,5 +1,5 @@
 # app/models/ai_models.py
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date
 
@@ -8,11 +8,21 @@ class LegalProfile(BaseModel):
     state: str
     case_type: str
 
+CASE_ID_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
+
 class ComprehensiveCaseInput(BaseModel):
-    prompt: str
-    legal_profile: LegalProfile
+    # prompt and legal_profile may be left out on follow-up turns of a stored case
+    prompt: Optional[str] = None
+    legal_profile: Optional[LegalProfile] = None
     doc_text: Optional[str] = None
     message: Optional[str] = None
+    case_id: Optional[str] = Field(None, pattern=CASE_ID_PATTERN)
+
+    @model_validator(mode="after")
+    def require_case_or_profile(self):
+        if self.case_id is None and (self.prompt is None or self.legal_profile is None):
+            raise ValueError("prompt and legal_profile are required when no case_id is given")
+        return self
 
 class TimelineStep(BaseModel):
     step: str
@@ -54,7 +64,14 @@ class LegalDocsOutput(BaseModel):
     download_url: Optional[str] = None
 
 class CaseInterpretOutput(BaseModel):
-    extracted_text: str
+    # Full, truncated or omitted depending on the request's ``text`` mode;
+    # the whole text can be paged from /api/upload/text/{text_id}
+    extracted_text: Optional[str] = None
     legal_summary: str
     actions: List[str]
     confidence_score: Optional[int] = None
+    document_type: Optional[str] = None
+    deadlines: Optional[List[str]] = None
+    text_id: Optional[str] = None
+    extracted_text_chars: Optional[int] = None
+    extracted_text_truncated: bool = False
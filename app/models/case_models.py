@@ -0,0 +1,30 @@
+# app/models/case_models.py
+from pydantic import BaseModel
+from typing import List, Optional, Dict, Any
+
+from app.models.ai_models import LegalProfile
+
+class CaseDocument(BaseModel):
+    filename: str
+    extracted_text: str
+    document_type: Optional[str] = None
+    legal_summary: Optional[str] = None
+
+class CaseMessage(BaseModel):
+    role: str
+    content: str
+
+class CaseRecord(BaseModel):
+    case_id: str
+    prompt: Optional[str] = None
+    legal_profile: Optional[LegalProfile] = None
+    analysis: Optional[Dict[str, Any]] = None
+    # Documents before this index were included in a previous analysis
+    analyzed_documents: int = 0
+    documents: List[CaseDocument] = []
+    # Most recent messages only, oldest first
+    messages: List[CaseMessage] = []
+    revision: int = 0
+    # Key of the latest turn and the revision it left the case at
+    turn_key: Optional[str] = None
+    turn_revision: Optional[int] = None
@@ -15,4 +15,30 @@ class DocumentProcessingResult(BaseModel):
     extracted_text: Optional[str] = None
     document_type: Optional[str] = None
     key_information: Optional[List[str]] = None
-    error_message: Optional[str] = None
\ No newline at end of file
+    error_message: Optional[str] = None
+
+class BatchFileResult(BaseModel):
+    filename: str
+    success: bool
+    file_type: Optional[str] = None
+    extracted_text: Optional[str] = None
+    text_id: Optional[str] = None
+    extracted_text_chars: Optional[int] = None
+    extracted_text_truncated: bool = False
+    duplicate_of: Optional[str] = None
+    error_message: Optional[str] = None
+
+class BatchCaseSummary(BaseModel):
+    case_id: Optional[str] = None
+    document_count: int
+    legal_summary: str
+    actions: List[str]
+    deadlines: Optional[List[str]] = None
+    confidence_score: Optional[int] = None
+
+class TextPage(BaseModel):
+    text_id: str
+    offset: int
+    total_chars: int
+    text: str
+    next_offset: Optional[int] = None
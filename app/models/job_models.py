@@ -0,0 +1,21 @@
+# app/models/job_models.py
+from pydantic import BaseModel
+from typing import Optional, Dict, Any
+from datetime import datetime
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    priority: int
+
+class JobStatus(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    priority: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
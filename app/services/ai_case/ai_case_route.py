@@ -1,9 +1,14 @@
 # app/services/ai_case/ai_case_route.py
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+import json
 from app.models.ai_models import ComprehensiveCaseInput, ComprehensiveCaseOutput
 from app.services.ai_case.ai_case_service import AICaseService
+from app.services.shared.rate_limiter import priority, INTERACTIVE
+from app.services.shared.case_store import CaseNotFoundError
+from app.services.shared.metrics import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 def get_ai_case_service():
     return AICaseService()
@@ -15,9 +20,36 @@ async def comprehensive_case_analysis(
 ):
     """
     Provides a comprehensive analysis of a legal case, including summary,
-    scoring, and a game plan.
+    scoring, and a game plan. With a ``case_id`` the case's documents,
+    analysis and conversation are kept server-side, so follow-up turns only
+    need the ``case_id`` and the new ``message``.
     """
     try:
-        return await service.comprehensive_analysis(input_data)
+        # Interactive analyses are scheduled ahead of background LLM work
+        with priority(INTERACTIVE):
+            return await service.comprehensive_analysis(input_data)
+    except CaseNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/case/stream")
+async def comprehensive_case_analysis_stream(
+    input_data: ComprehensiveCaseInput,
+    service: AICaseService = Depends(get_ai_case_service)
+):
+    """
+    Streams the case analysis as server-sent events: raw model ``token``
+    events, a ``field`` event as each output field completes, and a final
+    ``result`` (or ``error``) event with the validated analysis.
+    """
+    async def event_stream():
+        with priority(INTERACTIVE):
+            async for event, data in service.stream_comprehensive_analysis(input_data):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,30 +1,174 @@
 # app/services/ai_case/ai_case_service.py
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator, Optional, Tuple
 from datetime import datetime, timedelta
+import hashlib
 import json
-import re
-from app.services.shared.groq_client import GroqClient
+import time
+from app.core.config import settings
+from app.services.shared.model_router import model_router, ANALYZE
+from app.services.shared.json_utils import extract_json_object
+from app.services.shared.structured_output import StructuredOutput
+from app.services.shared.metrics import stage, STAGE_SECONDS
+from app.services.shared.json_stream import IncrementalJSONObjectParser
+from app.services.shared.case_store import case_store, CaseNotFoundError
+from app.services.shared.chunking import estimate_tokens
+from app.services.shared.retrieval import case_indexes, format_passages, relevant_text, LEGAL_TERMS
 from app.models.ai_models import (
     ComprehensiveCaseInput,
     ComprehensiveCaseOutput,
     TimelineStep,
 )
+from app.models.case_models import CaseRecord
+
+CASE_OUTPUT = StructuredOutput(ComprehensiveCaseOutput)
 
 class AICaseService:
     def __init__(self):
-        self.groq_client = GroqClient()
+        self.model_router = model_router
 
     def _extract_json_from_response(self, response: str) -> Dict[str, Any]:
         """
         Extracts a JSON object from a string, even if it's embedded in other text.
         """
-        # Find the start of the JSON object
-        json_match = re.search(r'\{.*\}', response, re.DOTALL)
-        if not json_match:
-            raise ValueError("No JSON object found in the response.")
+        return extract_json_object(response)
+
+    async def _load_case(self, input_data: ComprehensiveCaseInput) -> Optional[CaseRecord]:
+        """Return the stored case for ``input_data.case_id``, adding any new document text to it"""
+        if input_data.case_id is None:
+            return None
+        case = await case_store.get(input_data.case_id)
+        if case is None and (input_data.prompt is None or input_data.legal_profile is None):
+            raise CaseNotFoundError(f"Case not found: {input_data.case_id}")
+        if input_data.doc_text:
+            await case_store.add_document(input_data.case_id, "message attachment", input_data.doc_text)
+            case = await case_store.get(input_data.case_id)
+        return case
+
+    @staticmethod
+    def _turn_key(input_data: ComprehensiveCaseInput) -> str:
+        """Identify a request, so a retry of it can be told apart from a new turn"""
+        payload = input_data.model_dump_json(include={"prompt", "legal_profile", "doc_text", "message"})
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _replayed_turn(
+        self,
+        input_data: ComprehensiveCaseInput,
+        case: Optional[CaseRecord],
+    ) -> Optional[ComprehensiveCaseOutput]:
+        """The stored answer when this request repeats the case's latest turn and nothing has changed since"""
+        if case is None or case.analysis is None or case.turn_revision != case.revision:
+            return None
+        if case.turn_key != self._turn_key(input_data):
+            return None
+        return ComprehensiveCaseOutput.model_validate(case.analysis)
+
+    async def _record_turn(
+        self,
+        input_data: ComprehensiveCaseInput,
+        case: Optional[CaseRecord],
+        output: ComprehensiveCaseOutput,
+    ) -> None:
+        if input_data.case_id is None:
+            return
+        await case_store.record_turn(
+            input_data.case_id,
+            output.model_dump(),
+            analyzed_documents=len(case.documents) if case else 0,
+            prompt=input_data.prompt,
+            legal_profile=input_data.legal_profile,
+            message=input_data.message,
+            reply=output.chat_response if input_data.message else None,
+            turn_key=self._turn_key(input_data),
+            base_revision=case.revision if case else None,
+        )
+
+    def _build_prompts(
+        self,
+        input_data: ComprehensiveCaseInput,
+        case: Optional[CaseRecord] = None,
+    ) -> Tuple[str, str]:
+        """Build the system prompt and user prompt for a case analysis.
+
+        For a stored case the prompt is built from its state: the previous
+        analysis, summaries of documents it already covered, the text of
+        documents added since, and the recent conversation. Document text
+        is kept within ``RETRIEVAL_PROMPT_TOKENS``: when it does not fit, the
+        passages most relevant to the message and prompt are used, and a
+        follow-up question can also draw passages from earlier documents.
+        """
+        system_prompt = """
+        You are a legal AI assistant. Based on the user's prompt, legal profile,
+        and any provided document text, generate a comprehensive case analysis.
+        If a previous analysis is provided, update it with the new information.
+        The output should be a JSON object with the following structure:
+        {
+            "summary": "A brief summary of the case.",
+            "score": "An integer score from 1-100 representing the case's strength.",
+            "strengths": ["List of strengths of the case."],
+            "weaknesses": ["List of weaknesses of the case."],
+            "followup_questions": ["List of questions to ask the user for more information."],
+            "recommended_court": "The recommended court for this case.",
+            "gameplan": ["A list of steps to take."],
+            "timeline": [
+                {"step": "Step 1", "due_date": "YYYY-MM-DD"},
+                {"step": "Step 2", "due_date": "YYYY-MM-DD"}
+            ],
+            "chat_response": "A response to the user's message, if provided."
+        }
+        """
         
-        json_str = json_match.group(0)
-        return json.loads(json_str)
+        budget = settings.RETRIEVAL_PROMPT_TOKENS
+        query = " ".join(filter(None, [input_data.message, input_data.prompt or (case and case.prompt)]))
+
+        if case is None:
+            doc_text = input_data.doc_text and relevant_text(input_data.doc_text, query or LEGAL_TERMS, budget)
+            prompt = f"""
+        User Prompt: {input_data.prompt}
+        Legal Profile: {input_data.legal_profile.model_dump_json()}
+        Document Text: {doc_text or "Not provided"}
+        User Message: {input_data.message or "Not provided"}
+        """
+            return system_prompt, prompt
+
+        legal_profile = input_data.legal_profile or case.legal_profile
+        analyzed = case.analyzed_documents if case.analysis else 0
+        reviewed = "\n".join(
+            f"- {document.filename} ({document.document_type or 'document'}): "
+            f"{document.legal_summary or document.extracted_text[:300]}"
+            for document in case.documents[:analyzed]
+        )
+        total = len(case.documents)
+        new_tokens = sum(estimate_tokens(d.extracted_text) for d in case.documents[analyzed:])
+        sections = []
+        if new_tokens <= budget:
+            # New documents go in whole; the rest of the budget answers the question
+            sections = [f"{d.filename}:\n{d.extracted_text}" for d in case.documents[analyzed:]]
+            budget -= new_tokens
+            search_documents = range(analyzed) if input_data.message else range(0)
+            leads = ()
+        else:
+            search_documents = range(total) if input_data.message else range(analyzed, total)
+            leads = range(analyzed, total)
+        if search_documents and budget > 0:
+            index = case_indexes.get(case.case_id, [(d.filename, d.extracted_text) for d in case.documents])
+            passages = index.select(query or LEGAL_TERMS, budget, documents=search_documents, leads=leads)
+            if passages:
+                sections.append(format_passages(passages))
+        new_text = "\n\n".join(sections)
+        previous = None
+        if case.analysis:
+            previous = json.dumps({k: v for k, v in case.analysis.items() if k != "chat_response"})
+        history = "\n".join(f"{message.role}: {message.content}" for message in case.messages)
+        prompt = f"""
+        User Prompt: {input_data.prompt or case.prompt}
+        Legal Profile: {legal_profile.model_dump_json() if legal_profile else "Not provided"}
+        Previous Analysis: {previous or "None"}
+        Documents Already Reviewed: {reviewed or "None"}
+        Document Text: {new_text or "Not provided"}
+        Conversation So Far: {history or "None"}
+        User Message: {input_data.message or "Not provided"}
+        """
+        return system_prompt, prompt
 
     async def comprehensive_analysis(
         self, input_data: ComprehensiveCaseInput
@@ -34,46 +178,110 @@ class AICaseService:
         scoring, and a game plan.
         """
         try:
-            system_prompt = """
-            You are a legal AI assistant. Based on the user's prompt, legal profile,
-            and any provided document text, generate a comprehensive case analysis.
-            The output should be a JSON object with the following structure:
-            {
-                "summary": "A brief summary of the case.",
-                "score": "An integer score from 1-100 representing the case's strength.",
-                "strengths": ["List of strengths of the case."],
-                "weaknesses": ["List of weaknesses of the case."],
-                "followup_questions": ["List of questions to ask the user for more information."],
-                "recommended_court": "The recommended court for this case.",
-                "gameplan": ["A list of steps to take."],
-                "timeline": [
-                    {"step": "Step 1", "due_date": "YYYY-MM-DD"},
-                    {"step": "Step 2", "due_date": "YYYY-MM-DD"}
-                ],
-                "chat_response": "A response to the user's message, if provided."
-            }
-            """
-            
-            prompt = f"""
-            User Prompt: {input_data.prompt}
-            Legal Profile: {input_data.legal_profile.model_dump_json()}
-            Document Text: {input_data.doc_text or "Not provided"}
-            User Message: {input_data.message or "Not provided"}
-            """
+            case = await self._load_case(input_data)
+            replayed = self._replayed_turn(input_data, case)
+            if replayed is not None:
+                return replayed
+            system_prompt, prompt = self._build_prompts(input_data, case)
 
-            response = await self.groq_client.generate_response(
-                prompt=prompt,
-                system_prompt=system_prompt,
-                max_tokens=2000,
-            )
+            with stage("ai_case", "analyze"):
+                response = await self.model_router.generate(
+                    ANALYZE,
+                    prompt=prompt,
+                    system_prompt=system_prompt,
+                    cache_ttl=settings.COMPLETION_CACHE_TTL_CASE,
+                    json_mode=True,
+                )
             
-            analysis_result = self._extract_json_from_response(response)
+            with stage("ai_case", "parse"):
+                analysis_result = await CASE_OUTPUT.complete(
+                    response,
+                    prompt,
+                    system_prompt,
+                    cache_ttl=settings.COMPLETION_CACHE_TTL_CASE,
+                )
+                output = CASE_OUTPUT.build(analysis_result)
 
-            return ComprehensiveCaseOutput(**analysis_result)
+            await self._record_turn(input_data, case, output)
+            return output
 
+        except CaseNotFoundError:
+            raise
         except (json.JSONDecodeError, ValueError) as e:
             # Handle cases where the response is not valid JSON
             raise Exception(f"Failed to decode the analysis response from the AI: {e}")
         except Exception as e:
             # Handle other potential errors
             raise Exception(f"An error occurred during comprehensive analysis: {e}")
+
+    async def stream_comprehensive_analysis(
+        self, input_data: ComprehensiveCaseInput
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Streams a comprehensive analysis as ``(event, data)`` pairs: ``token``
+        for each chunk of model output, ``field`` for each top-level field as
+        soon as it is complete, then a single ``result`` with the validated
+        output (or ``error`` if it could not be produced). Fields that were
+        missing from the stream and re-requested are sent as ``field`` events
+        just before the result.
+        """
+        parser = IncrementalJSONObjectParser(lenient=True)
+        sent = set()
+        parse_failed = False
+        chunks = []
+        try:
+            case = await self._load_case(input_data)
+            replayed = self._replayed_turn(input_data, case)
+            if replayed is not None:
+                result = replayed.model_dump()
+                for field, value in result.items():
+                    yield "field", {"field": field, "value": value}
+                yield "result", result
+                return
+            system_prompt, prompt = self._build_prompts(input_data, case)
+            started = time.perf_counter()
+            async for chunk in self.model_router.stream(
+                ANALYZE,
+                prompt=prompt,
+                system_prompt=system_prompt,
+                cache_ttl=settings.COMPLETION_CACHE_TTL_CASE,
+            ):
+                if not chunks:
+                    STAGE_SECONDS.observe(time.perf_counter() - started, "ai_case", "stream_first_token")
+                chunks.append(chunk)
+                yield "token", chunk
+                if parse_failed or parser.finished:
+                    continue
+                try:
+                    fields = parser.feed(chunk)
+                except (json.JSONDecodeError, ValueError):
+                    # Keep forwarding tokens; the final parse below decides
+                    parse_failed = True
+                    continue
+                for field, value in fields:
+                    sent.add(field)
+                    yield "field", {"field": field, "value": value}
+
+            STAGE_SECONDS.observe(time.perf_counter() - started, "ai_case", "stream")
+            # JSON mode is not available for streamed completions, so the
+            # stream is repaired after the fact
+            analysis_result = await CASE_OUTPUT.complete(
+                "".join(chunks),
+                prompt,
+                system_prompt,
+                cache_ttl=settings.COMPLETION_CACHE_TTL_CASE,
+            )
+            output = CASE_OUTPUT.build(analysis_result)
+            await self._record_turn(input_data, case, output)
+            result = output.model_dump()
+            for field in analysis_result:
+                if field not in sent:
+                    yield "field", {"field": field, "value": result[field]}
+            yield "result", result
+
+        except CaseNotFoundError as e:
+            yield "error", {"detail": str(e)}
+        except (json.JSONDecodeError, ValueError) as e:
+            yield "error", {"detail": f"Failed to decode the analysis response from the AI: {e}"}
+        except Exception as e:
+            yield "error", {"detail": f"An error occurred during comprehensive analysis: {e}"}
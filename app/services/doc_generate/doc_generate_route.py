@@ -1,11 +1,26 @@
 # app/services/doc_generate/doc_generate_route.py
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import Response
+from urllib.parse import quote
 from typing import Dict, Any
+import hashlib
+import os
 
+from app.core.config import settings
 from app.models.ai_models import LegalDocsInput, LegalDocsOutput
-from app.services.doc_generate.doc_generate_service import DocGenerateService
+from app.services.doc_generate.doc_generate_service import DocGenerateService, DOCX_MEDIA_TYPE, download_filename
+from app.services.shared.document_store import document_store
+from app.services.shared.downloads import file_download_response
+from app.services.shared.metrics import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+# Serves download links issued before generated documents moved to the store
+legacy_router = APIRouter(route_class=TimedRoute)
+
+# Documents used to be written straight into uploads/; only those top-level
+# .docx files are served, never uploads/temp or anything outside the directory
+LEGACY_UPLOADS_DIR = "uploads"
 
 def get_doc_generate_service():
     return DocGenerateService()
@@ -21,6 +36,59 @@ async def generate_legal_document(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/doc_generate/file")
+async def generate_legal_document_file(
+    input_data: LegalDocsInput,
+    service: DocGenerateService = Depends(get_doc_generate_service)
+):
+    """Generate legal document and return the DOCX file directly, without storing it"""
+    try:
+        doc_title, docx_bytes = await service.generate_legal_document_file(input_data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return Response(
+        content=docx_bytes,
+        media_type=DOCX_MEDIA_TYPE,
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(download_filename(doc_title))}"}
+    )
+
+@router.get("/files/{doc_key}/{filename}")
+async def download_generated_document(doc_key: str, filename: str, request: Request):
+    """Download a stored generated document (supports ETag, conditional GET and Range)"""
+    if not document_store.is_valid_key(doc_key):
+        raise HTTPException(status_code=404, detail="Document not found or expired")
+    
+    return await file_download_response(
+        request,
+        document_store.path(doc_key),
+        etag=doc_key,
+        filename=filename,
+        media_type=DOCX_MEDIA_TYPE,
+        max_age=int(settings.DOCUMENT_STORE_TTL),
+    )
+
+@legacy_router.get("/uploads/{filename}", include_in_schema=False)
+async def download_legacy_document(filename: str, request: Request):
+    """Download a document generated before the document store existed (read-only)"""
+    if os.path.basename(filename) != filename or not filename.endswith(".docx"):
+        raise HTTPException(status_code=404, detail="Document not found or expired")
+    
+    path = os.path.join(LEGACY_UPLOADS_DIR, filename)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise HTTPException(status_code=404, detail="Document not found or expired")
+    
+    etag = hashlib.sha256(f"{filename}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:32]
+    return await file_download_response(
+        request,
+        path,
+        etag=etag,
+        filename=filename,
+        media_type=DOCX_MEDIA_TYPE,
+    )
+
 @router.get("/doc_templates")
 async def get_document_templates(
     service: DocGenerateService = Depends(get_doc_generate_service)
@@ -0,0 +1,123 @@
+# app/services/doc_generate/docx_renderer.py
+import copy
+import io
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Set
+
+from app.models.ai_models import UserDetails
+from app.services.shared.executor import execution_engine, THREAD
+
+if TYPE_CHECKING:
+    from docx.document import Document as DocumentObject
+
+
+class DocxRenderer:
+    """Renders generated letters into DOCX bytes from cached base documents.
+
+    Building a ``Document`` from scratch loads and parses python-docx's
+    default template every time. Instead, one base document per document
+    type is built once (styles, header, signature block) and each render
+    works on a deep copy of it. python-docx itself is imported on first use.
+    """
+
+    def __init__(self):
+        self._bases: Dict[Optional[str], "DocumentObject"] = {}
+        self._known_types: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def _build_base(self, document_type: Optional[str]) -> "DocumentObject":
+        from docx import Document
+        from docx.shared import Pt
+
+        doc = Document()
+
+        normal = doc.styles["Normal"]
+        normal.font.name = "Calibri"
+        normal.font.size = Pt(11)
+
+        header = doc.sections[0].header
+        header.paragraphs[0].text = document_type or ""
+        header.paragraphs[0].alignment = 2  # Right alignment
+
+        # Signature block; the request-specific body is inserted above it
+        doc.add_paragraph()
+        doc.add_paragraph("Sincerely,")
+        doc.add_paragraph()
+        doc.add_paragraph("_" * 30)
+        doc.add_paragraph()
+
+        # Round-trip through bytes so the cached base holds no proxy objects
+        # (python-docx caches the body proxy, which would not survive a
+        # deep copy); only its XML tree and parts are copied per render
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        buffer.seek(0)
+        return Document(buffer)
+
+    def _get_base(self, document_type: str) -> "DocumentObject":
+        # Free-form document types share one generic base so the cache stays bounded
+        key = document_type if document_type in self._known_types else None
+        base = self._bases.get(key)
+        if base is None:
+            with self._lock:
+                base = self._bases.get(key)
+                if base is None:
+                    base = self._build_base(key)
+                    self._bases[key] = base
+        return base
+
+    def render(self, content: str, title: str, user_details: UserDetails, document_type: str) -> bytes:
+        """Render a document to DOCX bytes (blocking)"""
+        doc = copy.deepcopy(self._get_base(document_type))
+        if document_type not in self._known_types:
+            doc.sections[0].header.paragraphs[0].text = document_type
+        paragraphs = doc.paragraphs
+        anchor = paragraphs[-5]
+
+        # Add title
+        title_para = anchor.insert_paragraph_before(title, style="Title")
+        title_para.alignment = 1  # Center alignment
+
+        # Add date
+        date_para = anchor.insert_paragraph_before(f"Date: {datetime.now().strftime('%B %d, %Y')}")
+        date_para.alignment = 2  # Right alignment
+
+        # Add sender information
+        anchor.insert_paragraph_before()
+        sender_para = anchor.insert_paragraph_before("From:")
+        sender_para.add_run(f"\n{user_details.name}")
+        sender_para.add_run(f"\n{user_details.address}")
+
+        # Add recipient information
+        anchor.insert_paragraph_before()
+        recipient_para = anchor.insert_paragraph_before("To:")
+        recipient_para.add_run(f"\n{user_details.opposing_party}")
+
+        # Add main content
+        anchor.insert_paragraph_before()
+        anchor.insert_paragraph_before(content)
+
+        # Sign with the client's name
+        paragraphs[-1].text = user_details.name
+
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        return buffer.getvalue()
+
+    async def render_async(self, content: str, title: str, user_details: UserDetails, document_type: str) -> bytes:
+        """Render a document on the worker thread pool"""
+        return await execution_engine.run(THREAD, self.render, content, title, user_details, document_type)
+
+    def register_types(self, document_types: Iterable[str]) -> None:
+        """Give these document types their own cached base"""
+        self._known_types.update(document_types)
+
+    def warm_up(self) -> None:
+        """Build the bases for every registered type up front"""
+        for document_type in list(self._known_types):
+            self._get_base(document_type)
+        self._get_base("")
+
+
+docx_renderer = DocxRenderer()
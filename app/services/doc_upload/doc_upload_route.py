@@ -1,51 +1,173 @@
 # app/services/doc_upload/doc_upload_route.py
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 import os
-from typing import Optional
+from typing import List, Literal, Optional, Tuple, TypeVar
+import json
 
 from app.services.doc_upload.doc_upload_service import DocUploadService
-from app.models.ai_models import CaseInterpretOutput
+from app.models.ai_models import CaseInterpretOutput, CASE_ID_PATTERN
+from app.models.doc_models import BatchFileResult, TextPage
+from app.services.shared.executor import cancel_on_disconnect
+from app.services.shared.ingest import read_upload, sniff_file_type, SNIFF_BYTES
 from app.core.config import settings
+from app.services.shared.metrics import TimedRoute, stage
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+ALLOWED_EXTENSIONS = ['.pdf', '.docx', '.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.txt']
+
+# Extensions that name the same format as the one sniff_file_type reports
+EQUIVALENT_EXTENSIONS = {'.jpeg': '.jpg', '.tif': '.tiff'}
+
+# Extraction cache keys: content digest, file type and extractor version
+TEXT_ID_PATTERN = r"^[0-9a-f]{64}-[a-z0-9]+-v[0-9A-Za-z.]+$"
+
+TextMode = Literal["full", "preview", "omit"]
+TEXT_MODE = Query(
+    "full",
+    description="full: echo the extracted text; preview: its first preview_chars; "
+                "omit: leave it out and page it from /text/{text_id}",
+)
+PREVIEW_CHARS = Query(None, ge=1, description="Preview length (default TEXT_PREVIEW_CHARS)")
+
+Shaped = TypeVar("Shaped", bound=BaseModel)
+
+def shape_text(result: Shaped, text: TextMode, preview_chars: Optional[int]) -> Shaped:
+    """Apply the requested text mode to a result carrying ``extracted_text``"""
+    if text == "full" or result.extracted_text is None:
+        return result
+    if text == "omit":
+        return result.model_copy(update={"extracted_text": None, "extracted_text_truncated": True})
+    limit = preview_chars or settings.TEXT_PREVIEW_CHARS
+    if len(result.extracted_text) <= limit:
+        return result
+    return result.model_copy(update={
+        "extracted_text": result.extracted_text[:limit],
+        "extracted_text_truncated": True,
+    })
+
+async def read_validated_upload(file: UploadFile) -> Tuple[bytes, str]:
+    """Read an upload and return its bytes and sniffed file type, or raise a 400.
+
+    The content must match the extension: a renamed file (a PDF called
+    .txt, or text called .pdf) is refused rather than parsed as the wrong
+    format. Plain text has no signature, so any upload that decodes as text
+    sniffs as .txt.
+    """
+    # Validate file
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file provided")
+    
+    # Check file type against both the extension and the leading bytes
+    file_ext = os.path.splitext(file.filename)[1].lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+    
+    # Stream the upload, stopping as soon as it crosses the size limit
+    with stage("doc_upload", "read"):
+        file_content = await read_upload(file, settings.MAX_FILE_SIZE)
+    
+    file_type = sniff_file_type(file_content[:SNIFF_BYTES])
+    if file_type is None:
+        raise HTTPException(
+            status_code=400,
+            detail="File content does not match a supported document type"
+        )
+    if file_type != EQUIVALENT_EXTENSIONS.get(file_ext, file_ext):
+        raise HTTPException(
+            status_code=400,
+            detail=f"File content does not match its {file_ext} extension"
+        )
+    return file_content, file_type
 
 def get_doc_upload_service():
     return DocUploadService()
 
 @router.post("/doc", response_model=CaseInterpretOutput)
 async def upload_document(
+    request: Request,
     file: UploadFile = File(...),
-    case_id: Optional[str] = Form(None),
+    case_id: Optional[str] = Form(None, pattern=CASE_ID_PATTERN),
+    text: TextMode = TEXT_MODE,
+    preview_chars: Optional[int] = PREVIEW_CHARS,
     service: DocUploadService = Depends(get_doc_upload_service)
 ):
     """Upload and process legal document"""
     try:
-        # Validate file
-        if not file.filename:
-            raise HTTPException(status_code=400, detail="No file provided")
+        file_content, file_type = await read_validated_upload(file)
         
-        # Check file size
-        file_content = await file.read()
-        if len(file_content) > settings.MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"File size too large. Maximum size: {settings.MAX_FILE_SIZE} bytes"
-            )
-        
-        # Check file type
-        allowed_extensions = ['.pdf', '.docx', '.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.txt']
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        if file_ext not in allowed_extensions:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported file type. Allowed: {', '.join(allowed_extensions)}"
-            )
-        
-        # Process document
-        result = await service.process_document(file_content, file.filename, case_id)
-        return result
+        # Process document, abandoning extraction if the client goes away
+        result = await cancel_on_disconnect(
+            request, service.process_document(file_content, file.filename, case_id, file_type)
+        )
+        return shape_text(result, text, preview_chars)
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/batch")
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    case_id: Optional[str] = Form(None, pattern=CASE_ID_PATTERN),
+    text: TextMode = TEXT_MODE,
+    preview_chars: Optional[int] = PREVIEW_CHARS,
+    service: DocUploadService = Depends(get_doc_upload_service)
+):
+    """
+    Upload several documents for one case. Streams newline-delimited JSON:
+    one ``file`` line per document as its extraction finishes, then a
+    single ``summary`` line analysing all documents together.
+    """
+    if len(files) > settings.BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files. Maximum per batch: {settings.BATCH_MAX_FILES}"
+        )
+    
+    # Validate every file up front so a bad upload fails the whole request
+    uploads = []
+    for file in files:
+        file_content, file_type = await read_validated_upload(file)
+        uploads.append((file.filename, file_content, file_type))
+    
+    async def result_stream():
+        try:
+            async for result in service.process_batch(uploads, case_id):
+                if isinstance(result, BatchFileResult):
+                    kind = "file"
+                    result = shape_text(result, text, preview_chars)
+                else:
+                    kind = "summary"
+                yield json.dumps({"type": kind, **result.model_dump()}) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+    
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+@router.get("/text/{text_id}", response_model=TextPage)
+async def get_extracted_text(
+    text_id: str = Path(..., pattern=TEXT_ID_PATTERN),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, description="Characters per page (default and maximum TEXT_PAGE_CHARS)"),
+    service: DocUploadService = Depends(get_doc_upload_service)
+):
+    """Page through a document's extracted text by the text_id returned from an upload"""
+    extracted_text = await service.get_text(text_id)
+    if extracted_text is None:
+        raise HTTPException(status_code=404, detail="Text not found or expired; upload the document again")
+    limit = min(limit or settings.TEXT_PAGE_CHARS, settings.TEXT_PAGE_CHARS)
+    end = offset + limit
+    return TextPage(
+        text_id=text_id,
+        offset=offset,
+        total_chars=len(extracted_text),
+        text=extracted_text[offset:end],
+        next_offset=end if end < len(extracted_text) else None,
+    )
@@ -1,100 +1,391 @@
 # app/services/doc_upload/doc_upload_service.py
-from typing import Dict, Any
+from typing import Dict, Any, Optional, List, Tuple, Union, AsyncIterator
+import asyncio
 import os
 from datetime import datetime
 
-from app.services.shared.groq_client import GroqClient
-from app.services.shared.utils import FileUtils
-from app.models.doc_models import DocumentProcessingResult
+from app.core.config import settings
+from app.services.shared.model_router import model_router, CLASSIFY, SUMMARIZE
+from app.services.shared.utils import FileUtils, EXTRACTOR_VERSION
+from app.services.shared.extraction_cache import extraction_cache
+from app.services.shared.structured_output import StructuredOutput
+from app.services.shared.case_store import case_store
+from app.services.shared.chunking import chunk_text, estimate_tokens, group_pieces, CHARS_PER_TOKEN
+from app.services.shared.retrieval import relevant_text, LEGAL_TERMS
+from app.services.shared.metrics import stage
+from app.models.doc_models import DocumentProcessingResult, BatchFileResult, BatchCaseSummary
 from app.models.ai_models import CaseInterpretOutput
 
+ANALYSIS_SCHEMA = """{
+            "document_type": "lease, notice, contract, summons, etc.",
+            "legal_summary": "A clear legal summary of what this document contains, the key parties and the key legal issues or concerns.",
+            "actions": ["Recommended actions the user should take, most urgent first."],
+            "deadlines": ["Important deadlines or dates mentioned, with what is due."],
+            "confidence_score": "An integer from 1-100 for how confident you are in this analysis."
+        }"""
+
+DOCUMENT_ANALYSIS_PROMPT = f"""You are a legal document analyzer. Read the document text and respond
+        with a JSON object with the following structure:
+        {ANALYSIS_SCHEMA}
+        
+        Be practical and actionable in your recommendations."""
+
+CHUNK_ANALYSIS_PROMPT = """You are a legal document analyzer. You are given one part of a longer
+        document. Respond with a JSON object with the following structure:
+        {
+            "document_type": "lease, notice, contract, summons, etc., if apparent from this part.",
+            "summary": "What this part says: parties, obligations, amounts and legal issues.",
+            "actions": ["Actions this part requires of the user."],
+            "deadlines": ["Deadlines or dates in this part, with what is due."]
+        }
+        
+        Only report what is in this part. Be concise."""
+
+MERGE_PARTIALS_PROMPT = """You are a legal document analyzer. You are given analyses of
+        consecutive parts of a longer legal document. Merge them into one analysis
+        of that stretch of the document, removing duplicates and keeping every
+        distinct action and deadline. Respond with a JSON object with the following structure:
+        {
+            "document_type": "lease, notice, contract, summons, etc., if apparent from these parts.",
+            "summary": "What these parts say: parties, obligations, amounts and legal issues.",
+            "actions": ["Actions these parts require of the user."],
+            "deadlines": ["Deadlines or dates in these parts, with what is due."]
+        }
+        
+        Only report what is in these analyses. Be concise."""
+
+REDUCE_ANALYSIS_PROMPT = f"""You are a legal document analyzer. You are given partial analyses of
+        consecutive parts of one document. Merge them into a single analysis of the
+        whole document, removing duplicates and keeping every distinct deadline.
+        Respond with a JSON object with the following structure:
+        {ANALYSIS_SCHEMA}
+        
+        Be practical and actionable in your recommendations."""
+
+# The fields the model produces; extracted_text is filled in by the service
+DOCUMENT_OUTPUT = StructuredOutput(
+    CaseInterpretOutput,
+    fields=("document_type", "legal_summary", "actions", "deadlines", "confidence_score"),
+    required=("legal_summary",),
+    task=SUMMARIZE,
+)
+
+def _label_parts(partials: List[str]) -> str:
+    """Join partial analyses, numbered in document order"""
+    return "\n\n".join(
+        f"Part {index} of {len(partials)}:\n{partial}" for index, partial in enumerate(partials, start=1)
+    )
+
 class DocUploadService:
     def __init__(self):
-        self.groq_client = GroqClient()
+        self.model_router = model_router
         self.file_utils = FileUtils()
     
-    async def process_document(self, file_content: bytes, filename: str, case_id: str = None) -> CaseInterpretOutput:
-        """Process uploaded document and extract legal information"""
+    async def process_document(
+        self,
+        file_content: bytes,
+        filename: str,
+        case_id: str = None,
+        file_type: Optional[str] = None
+    ) -> CaseInterpretOutput:
+        """Process uploaded document and extract legal information.
+
+        ``file_type`` is the sniffed extension of the upload; the filename's
+        extension is used when it is not given.
+        """
         try:
-            # Save file temporarily
-            unique_filename = self.file_utils.generate_unique_filename(filename)
-            file_path = await self.file_utils.save_upload_file(file_content, unique_filename)
-            
-            # Extract text based on file type
-            file_ext = os.path.splitext(filename)[1].lower()
-            
-            if file_ext == '.pdf':
-                extracted_text = await self.file_utils.extract_text_from_pdf(file_path)
-            elif file_ext == '.docx':
-                extracted_text = await self.file_utils.extract_text_from_docx(file_path)
-            elif file_ext in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']:
-                extracted_text = await self.file_utils.extract_text_from_image(file_path)
-            elif file_ext == '.txt':
-                with open(file_path, 'r') as f:
-                    extracted_text = f.read()
-            else:
-                raise Exception(f"Unsupported file type: {file_ext}")
-            
-            # Clean up temporary file
-            await self.file_utils.cleanup_file(file_path)
+            extracted_text = await self.extract_document(file_content, filename, file_type)
             
             if not extracted_text.strip():
                 raise Exception("No text could be extracted from the document")
             
-            # Analyze document with AI
-            analysis = await self.groq_client.analyze_legal_document(extracted_text)
-            
-            # Generate legal summary and actions
-            system_prompt = """You are a legal document analyzer. Based on the document text, provide:
-            1. A clear legal summary of what this document contains
-            2. A list of recommended actions the user should take
-            3. Important deadlines or dates mentioned
-            4. Key legal issues or concerns
-            
-            Be practical and actionable in your recommendations."""
+            # Analyze document with AI in a single structured round trip
+            with stage("doc_upload", "analyze"):
+                analysis = await self._analyze_document(extracted_text)
             
-            prompt = f"""
-            Document Analysis:
-            {analysis.get('analysis', 'Document processed')}
-            
-            Extracted Text:
-            {extracted_text[:2000]}...
-            
-            Provide a legal summary and recommended actions.
-            """
-            
-            legal_summary = await self.groq_client.generate_response(
-                prompt=prompt,
-                system_prompt=system_prompt,
-                max_tokens=1000
-            )
-            
-            # Generate action items
-            actions = [
-                "Review document thoroughly",
-                "Consult with attorney if needed",
-                "Keep original document safe",
-                "Note any important deadlines"
-            ]
-            
-            # Try to extract specific actions from the summary
-            if "respond" in legal_summary.lower():
-                actions.insert(0, "Prepare written response")
-            if "deadline" in legal_summary.lower():
-                actions.insert(0, "Check all deadlines immediately")
-            if "court" in legal_summary.lower():
-                actions.insert(0, "Prepare for court proceedings")
+            # Keep the text with the case so follow-up turns need not resend it
+            if case_id:
+                await case_store.add_document(
+                    case_id,
+                    filename,
+                    extracted_text,
+                    document_type=analysis["document_type"],
+                    legal_summary=analysis["legal_summary"]
+                )
             
             return CaseInterpretOutput(
                 extracted_text=extracted_text,
-                legal_summary=legal_summary,
-                actions=actions[:5],  # Return top 5 actions
-                confidence_score=85
+                text_id=self.text_id(file_content, filename, file_type),
+                extracted_text_chars=len(extracted_text),
+                legal_summary=analysis["legal_summary"],
+                actions=analysis["actions"],
+                confidence_score=analysis["confidence_score"],
+                document_type=analysis["document_type"],
+                deadlines=analysis["deadlines"]
             )
             
         except Exception as e:
             raise Exception(f"Error processing document: {str(e)}")
     
+    @staticmethod
+    def text_id(file_content: bytes, filename: str, file_type: Optional[str] = None) -> str:
+        """The extraction cache key of an upload, which clients use to page its text"""
+        file_type = file_type or os.path.splitext(filename)[1].lower()
+        return extraction_cache.make_key(file_content, file_type, EXTRACTOR_VERSION)
+    
+    async def extract_document(
+        self,
+        file_content: bytes,
+        filename: str,
+        file_type: Optional[str] = None
+    ) -> str:
+        """Return the document's text, from the extraction cache when possible"""
+        file_type = file_type or os.path.splitext(filename)[1].lower()
+        cache_key = self.text_id(file_content, filename, file_type)
+        extracted_text = await extraction_cache.get(cache_key)
+        
+        if extracted_text is None:
+            with stage("doc_upload", f"extract_{file_type.lstrip('.')}"):
+                extracted_text = await self._extract_text(file_content, file_type)
+            if extracted_text.strip():
+                await extraction_cache.set(cache_key, extracted_text)
+        
+        return extracted_text
+    
+    async def get_text(self, text_id: str) -> Optional[str]:
+        """Return a previously extracted text by its ``text_id``, or None once it has been evicted"""
+        return await extraction_cache.get(text_id)
+    
+    async def process_batch(
+        self,
+        files: List[Tuple[str, bytes, str]],
+        case_id: Optional[str] = None
+    ) -> AsyncIterator[Union[BatchFileResult, BatchCaseSummary]]:
+        """Extract a batch of ``(filename, content, file_type)`` uploads.
+
+        Yields a ``BatchFileResult`` per file as soon as it is done, then one
+        ``BatchCaseSummary`` covering every document from a single LLM call.
+        Identical files are extracted once; each copy's result follows its
+        original's, with the same outcome and ``duplicate_of`` set.
+        """
+        semaphore = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+        first_by_text_id: Dict[str, int] = {}
+        duplicates: Dict[int, List[Tuple[str, str]]] = {}
+        unique_files = []
+        for filename, file_content, file_type in files:
+            text_id = self.text_id(file_content, filename, file_type)
+            if text_id in first_by_text_id:
+                duplicates[first_by_text_id[text_id]].append((filename, file_type))
+            else:
+                first_by_text_id[text_id] = len(unique_files)
+                duplicates[len(unique_files)] = []
+                unique_files.append((filename, file_content, file_type))
+        
+        async def extract_one(index: int, filename: str, file_content: bytes, file_type: str) -> Tuple[int, BatchFileResult]:
+            async with semaphore:
+                try:
+                    text = await self.extract_document(file_content, filename, file_type)
+                except Exception as e:
+                    return index, BatchFileResult(filename=filename, success=False, file_type=file_type, error_message=str(e))
+            if not text.strip():
+                return index, BatchFileResult(
+                    filename=filename,
+                    success=False,
+                    file_type=file_type,
+                    error_message="No text could be extracted from the document"
+                )
+            return index, BatchFileResult(
+                filename=filename,
+                success=True,
+                file_type=file_type,
+                extracted_text=text,
+                text_id=self.text_id(file_content, filename, file_type),
+                extracted_text_chars=len(text)
+            )
+        
+        extracted: List[Tuple[int, BatchFileResult]] = []
+        tasks = [
+            asyncio.ensure_future(extract_one(index, *f))
+            for index, f in enumerate(unique_files)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, result = await next_done
+                if result.success:
+                    extracted.append((index, result))
+                yield result
+                for filename, file_type in duplicates[index]:
+                    yield result.model_copy(update={
+                        "filename": filename,
+                        "file_type": file_type,
+                        "duplicate_of": result.filename
+                    })
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        if not extracted:
+            raise Exception("No text could be extracted from any document in the batch")
+        
+        if case_id:
+            for _, result in sorted(extracted, key=lambda item: item[0]):
+                await case_store.add_document(case_id, result.filename, result.extracted_text)
+        
+        # Keep upload order so the model reads documents as submitted
+        extracted.sort(key=lambda item: item[0])
+        # Long documents contribute their opening and their most salient
+        # clauses (deadlines, amounts, notices) rather than a blind prefix
+        limit = settings.BATCH_SUMMARY_CHARS_PER_DOC // CHARS_PER_TOKEN
+        combined = "\n\n".join(
+            f"Document {number}: {result.filename}\n"
+            f"{relevant_text(result.extracted_text, LEGAL_TERMS, limit, result.filename)}"
+            for number, (_, result) in enumerate(extracted, start=1)
+        )
+        with stage("doc_upload", "batch_analyze"):
+            analysis = await self._analyze_document(
+                combined,
+                intro="Analyze these legal documents from the same case together"
+            )
+        yield BatchCaseSummary(
+            case_id=case_id,
+            document_count=len(extracted),
+            legal_summary=analysis["legal_summary"],
+            actions=analysis["actions"],
+            deadlines=analysis["deadlines"],
+            confidence_score=analysis["confidence_score"]
+        )
+    
+    async def _analyze_document(
+        self,
+        extracted_text: str,
+        intro: str = "Analyze this legal document"
+    ) -> Dict[str, Any]:
+        """Summarize a document and list actions, deadlines and confidence.
+
+        Documents that fit the model's context are analyzed in one call.
+        Longer ones are split into chunks that are analyzed concurrently and
+        then reduced into a single analysis.
+        """
+        if estimate_tokens(extracted_text) <= settings.CHUNK_SINGLE_PASS_TOKENS:
+            return await self._request_analysis(
+                f"{intro}:\n\n{extracted_text}",
+                DOCUMENT_ANALYSIS_PROMPT
+            )
+        
+        chunks = chunk_text(extracted_text, settings.CHUNK_MAX_TOKENS)
+        semaphore = asyncio.Semaphore(settings.CHUNK_MAX_CONCURRENCY)
+        
+        async def summarize(stage_name: str, prompt: str, system_prompt: str) -> str:
+            async with semaphore:
+                with stage("doc_upload", stage_name):
+                    response = await self.model_router.generate(
+                        SUMMARIZE,
+                        prompt=prompt,
+                        system_prompt=system_prompt,
+                        max_tokens=settings.CHUNK_MAP_MAX_TOKENS,
+                        cache_ttl=settings.COMPLETION_CACHE_TTL_DOCUMENT,
+                        json_mode=True
+                    )
+            return response.strip()
+        
+        async def merge(group: List[str]) -> str:
+            if len(group) == 1:
+                return group[0]
+            return await summarize(
+                "merge_partials",
+                f"Merge these analyses of consecutive parts of a longer legal document:\n\n{_label_parts(group)}",
+                MERGE_PARTIALS_PROMPT,
+            )
+        
+        # Each chunk prompt depends only on the chunk text, so unchanged
+        # chunks are served from the completion cache on re-analysis
+        partials = await asyncio.gather(*(
+            summarize("analyze_chunk", f"Analyze this part of a longer legal document:\n\n{chunk}", CHUNK_ANALYSIS_PROMPT)
+            for chunk in chunks
+        ))
+        
+        # Merge neighbouring partial analyses in rounds until they fit in one
+        # prompt; groups are cut between analyses, never inside one
+        while estimate_tokens(_label_parts(partials)) > settings.CHUNK_SINGLE_PASS_TOKENS and len(partials) > 1:
+            groups = group_pieces(partials, settings.CHUNK_MAX_TOKENS)
+            if len(groups) >= len(partials):
+                break
+            partials = await asyncio.gather(*(merge(group) for group in groups))
+        
+        return await self._request_analysis(
+            f"{intro}. It was analyzed in {len(partials)} consecutive parts; "
+            f"combine these partial analyses:\n\n{_label_parts(partials)}",
+            REDUCE_ANALYSIS_PROMPT
+        )
+    
+    async def _request_analysis(self, prompt: str, system_prompt: str) -> Dict[str, Any]:
+        """Make one structured analysis call and normalize its result"""
+        response = await self.model_router.generate(
+            SUMMARIZE,
+            prompt=prompt,
+            system_prompt=system_prompt,
+            cache_ttl=settings.COMPLETION_CACHE_TTL_DOCUMENT,
+            json_mode=True
+        )
+        
+        try:
+            result = await DOCUMENT_OUTPUT.complete(
+                response,
+                prompt,
+                system_prompt,
+                cache_ttl=settings.COMPLETION_CACHE_TTL_DOCUMENT,
+            )
+        except ValueError:
+            # Fall back to treating the whole response as the summary
+            result = {"legal_summary": response}
+        
+        legal_summary = str(result.get("legal_summary") or response).strip()
+        deadlines = [str(d) for d in result.get("deadlines") or [] if str(d).strip()]
+        
+        try:
+            confidence_score = max(1, min(100, int(result.get("confidence_score"))))
+        except (TypeError, ValueError):
+            confidence_score = 85
+        
+        # Model-suggested actions first, topped up with the standard checklist
+        actions = [str(a) for a in result.get("actions") or [] if str(a).strip()]
+        if not actions:
+            if "respond" in legal_summary.lower():
+                actions.append("Prepare written response")
+            if "deadline" in legal_summary.lower() or deadlines:
+                actions.append("Check all deadlines immediately")
+            if "court" in legal_summary.lower():
+                actions.append("Prepare for court proceedings")
+        for default_action in [
+            "Review document thoroughly",
+            "Consult with attorney if needed",
+            "Keep original document safe",
+            "Note any important deadlines"
+        ]:
+            if default_action not in actions:
+                actions.append(default_action)
+        
+        return {
+            "legal_summary": legal_summary,
+            "actions": actions[:5],  # Return top 5 actions
+            "deadlines": deadlines,
+            "confidence_score": confidence_score,
+            "document_type": str(result["document_type"]) if result.get("document_type") else None
+        }
+    
+    async def _extract_text(self, file_content: bytes, file_type: str) -> str:
+        """Run the extractor matching ``file_type`` on the in-memory upload"""
+        if file_type == '.pdf':
+            return await self.file_utils.extract_text_from_pdf(file_content)
+        elif file_type == '.docx':
+            return await self.file_utils.extract_text_from_docx(file_content)
+        elif file_type in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']:
+            return await self.file_utils.extract_text_from_image(file_content)
+        elif file_type == '.txt':
+            return await self.file_utils.extract_text_from_txt(file_content)
+        else:
+            raise Exception(f"Unsupported file type: {file_type}")
+    
     async def analyze_document_type(self, text: str) -> Dict[str, Any]:
         """Analyze document type and extract key information"""
         try:
@@ -107,10 +398,12 @@ class DocUploadService:
             
             Return analysis in a structured format."""
             
-            response = await self.groq_client.generate_response(
+            response = await self.model_router.generate(
+                CLASSIFY,
                 prompt=f"Analyze this document:\n\n{text[:1500]}",
                 system_prompt=system_prompt,
-                max_tokens=800
+                max_tokens=800,
+                cache_ttl=settings.COMPLETION_CACHE_TTL_DOCUMENT
             )
             
             return {
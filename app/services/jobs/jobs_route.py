@@ -0,0 +1,58 @@
+# app/services/jobs/jobs_route.py
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query
+from typing import Optional
+
+from app.models.ai_models import ComprehensiveCaseInput, LegalDocsInput, CASE_ID_PATTERN
+from app.models.job_models import JobSubmitResponse, JobStatus
+from app.services.doc_upload.doc_upload_route import read_validated_upload
+from app.services.jobs.jobs_service import (
+    job_queue,
+    QueueFullError,
+    QUEUED,
+    CASE_ANALYSIS,
+    DOCUMENT,
+    DOC_GENERATE,
+)
+from app.services.shared.metrics import TimedRoute
+
+router = APIRouter(route_class=TimedRoute)
+
+PRIORITY = Query(5, ge=0, le=9, description="0 runs first, 9 runs last")
+
+async def _submit(kind: str, payload: dict, priority: int, attachment: Optional[bytes] = None) -> JobSubmitResponse:
+    try:
+        job_id = await job_queue.submit(kind, payload, priority, attachment)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return JobSubmitResponse(job_id=job_id, kind=kind, status=QUEUED, priority=priority)
+
+@router.post("/case", response_model=JobSubmitResponse, status_code=202)
+async def submit_case_analysis(input_data: ComprehensiveCaseInput, priority: int = PRIORITY):
+    """Queue a comprehensive case analysis"""
+    return await _submit(CASE_ANALYSIS, input_data.model_dump(), priority)
+
+@router.post("/doc", response_model=JobSubmitResponse, status_code=202)
+async def submit_document(
+    file: UploadFile = File(...),
+    case_id: Optional[str] = Form(None, pattern=CASE_ID_PATTERN),
+    priority: int = PRIORITY
+):
+    """Queue processing of an uploaded legal document"""
+    file_content, file_type = await read_validated_upload(file)
+    payload = {"filename": file.filename, "case_id": case_id, "file_type": file_type}
+    return await _submit(DOCUMENT, payload, priority, file_content)
+
+@router.post("/doc_generate", response_model=JobSubmitResponse, status_code=202)
+async def submit_doc_generate(input_data: LegalDocsInput, priority: int = PRIORITY):
+    """Queue generation of a legal document"""
+    return await _submit(DOC_GENERATE, input_data.model_dump(), priority)
+
+@router.get("/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Get a job's status, and its result once it has finished"""
+    status = await job_queue.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
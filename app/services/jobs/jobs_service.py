@@ -0,0 +1,310 @@
+# app/services/jobs/jobs_service.py
+import asyncio
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings, Lazy
+from app.models.ai_models import ComprehensiveCaseInput, LegalDocsInput
+from app.models.job_models import JobStatus
+from app.services.ai_case.ai_case_service import AICaseService
+from app.services.doc_upload.doc_upload_service import DocUploadService
+from app.services.doc_generate.doc_generate_service import DocGenerateService
+from app.services.shared.rate_limiter import priority as llm_priority, BACKGROUND
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+CASE_ANALYSIS = "case_analysis"
+DOCUMENT = "document"
+DOC_GENERATE = "doc_generate"
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity"""
+
+
+class JobStore:
+    """SQLite persistence so queued jobs survive a restart"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, priority INTEGER NOT NULL, "
+                "status TEXT NOT NULL, payload TEXT NOT NULL, attachment BLOB, "
+                "result TEXT, error TEXT, created_at REAL NOT NULL, "
+                "started_at REAL, finished_at REAL, owner INTEGER)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+            try:
+                # Stores created before jobs recorded the process running them
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner INTEGER")
+            except sqlite3.OperationalError:
+                pass
+        return self._conn
+
+    def insert(self, job_id: str, kind: str, priority: int, payload: Dict[str, Any], attachment: Optional[bytes]) -> float:
+        created_at = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT INTO jobs (id, kind, priority, status, payload, attachment, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, priority, QUEUED, json.dumps(payload), attachment, created_at),
+                )
+        return created_at
+
+    def load(self, job_id: str) -> Optional[Tuple[str, Dict[str, Any], Optional[bytes]]]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT kind, payload, attachment FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), row[2]
+
+    def claim(self, job_id: str, owner: int) -> bool:
+        """Mark a queued job as running in process ``owner``; False if another worker took it"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return conn.execute(
+                    "UPDATE jobs SET status = ?, started_at = ?, owner = ? WHERE id = ? AND status = ?",
+                    (RUNNING, time.time(), owner, job_id, QUEUED),
+                ).rowcount == 1
+
+    def mark_finished(self, job_id: str, result: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                # The attachment is only needed to run the job
+                conn.execute(
+                    "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, "
+                    "attachment = NULL WHERE id = ?",
+                    (
+                        FAILED if error else SUCCEEDED,
+                        json.dumps(result) if result is not None else None,
+                        error,
+                        time.time(),
+                        job_id,
+                    ),
+                )
+
+    def status(self, job_id: str) -> Optional[JobStatus]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT id, kind, status, priority, created_at, started_at, finished_at, result, error "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return JobStatus(
+            job_id=row[0],
+            kind=row[1],
+            status=row[2],
+            priority=row[3],
+            created_at=datetime.fromtimestamp(row[4]),
+            started_at=datetime.fromtimestamp(row[5]) if row[5] else None,
+            finished_at=datetime.fromtimestamp(row[6]) if row[6] else None,
+            result=json.loads(row[7]) if row[7] else None,
+            error=row[8],
+        )
+
+    def requeue(self, owner: Optional[int] = None) -> int:
+        """Put running jobs back in the queue: those of process ``owner``, or all of them"""
+        query = "UPDATE jobs SET status = ?, started_at = NULL, owner = NULL WHERE status = ?"
+        params: Tuple[Any, ...] = (QUEUED, RUNNING)
+        if owner is not None:
+            query += " AND owner = ?"
+            params += (owner,)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return conn.execute(query, params).rowcount
+
+    def unfinished(self) -> List[Tuple[str, int, float]]:
+        """Jobs waiting to run"""
+        with self._lock:
+            return self._connect().execute(
+                "SELECT id, priority, created_at FROM jobs WHERE status = ? ORDER BY created_at",
+                (QUEUED,),
+            ).fetchall()
+
+    def prune(self, older_than: float) -> None:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                    (SUCCEEDED, FAILED, older_than),
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class JobQueue:
+    """Priority queue of background jobs drained by a fixed pool of workers.
+
+    Lower ``priority`` values run first; jobs of equal priority run in
+    submission order. The queue is bounded so bursts are refused rather
+    than piling up without limit.
+    """
+
+    def __init__(self, store: Optional[JobStore] = None):
+        self.store = store or JobStore(settings.JOBS_DB_PATH)
+        # A single process owns every running job, so those left over were
+        # interrupted. Under the multi-worker server the master re-queues a
+        # worker's jobs when it exits instead (see app/core/server.py).
+        self.requeue_on_startup = True
+        self._stopping = False
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._sequence = itertools.count()
+        self._handlers: Dict[str, Callable[[Dict[str, Any], Optional[bytes]], Awaitable[Any]]] = {
+            CASE_ANALYSIS: self._run_case_analysis,
+            DOCUMENT: self._run_document,
+            DOC_GENERATE: self._run_doc_generate,
+        }
+        self._running = 0
+        self._completed = 0
+
+    async def startup(self) -> None:
+        """Reload unfinished jobs and start the workers"""
+        self._queue = asyncio.PriorityQueue()
+        self._stopping = False
+        await asyncio.to_thread(self.store.prune, time.time() - settings.JOBS_RESULT_TTL)
+        if self.requeue_on_startup:
+            await asyncio.to_thread(self.store.requeue)
+        for job_id, priority, _ in await asyncio.to_thread(self.store.unfinished):
+            self._queue.put_nowait((priority, next(self._sequence), job_id))
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{index}")
+            for index in range(settings.JOBS_WORKERS)
+        ]
+
+    async def shutdown(self, timeout: float = 0.0) -> None:
+        """Stop taking jobs, give running ones ``timeout`` seconds, then stop the workers.
+
+        Jobs still running at the deadline are interrupted and re-queued on
+        next startup.
+        """
+        self._stopping = True
+        deadline = time.monotonic() + timeout
+        while self._running and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.store.close()
+
+    async def submit(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        priority: int = 5,
+        attachment: Optional[bytes] = None,
+    ) -> str:
+        """Persist and enqueue a job, returning its id"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+        if self._queue.qsize() >= settings.JOBS_MAX_QUEUE:
+            raise QueueFullError("Job queue is full, try again later")
+
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(self.store.insert, job_id, kind, priority, payload, attachment)
+        self._queue.put_nowait((priority, next(self._sequence), job_id))
+        return job_id
+
+    async def status(self, job_id: str) -> Optional[JobStatus]:
+        return await asyncio.to_thread(self.store.status, job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": self._running,
+            "completed": self._completed,
+            "workers": len(self._workers),
+            "max_queue": settings.JOBS_MAX_QUEUE,
+        }
+
+    async def _worker(self) -> None:
+        while not self._stopping:
+            _, _, job_id = await self._queue.get()
+            if self._stopping:
+                # Left queued in the store for the next worker to start
+                break
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        # Every worker process loads the queued jobs at startup; whichever
+        # claims a job first runs it
+        if not await asyncio.to_thread(self.store.claim, job_id, os.getpid()):
+            return
+        job = await asyncio.to_thread(self.store.load, job_id)
+        if job is None:
+            return
+        kind, payload, attachment = job
+        self._running += 1
+        result = None
+        error = None
+        try:
+            # Queued work yields the LLM budget to interactive requests
+            with llm_priority(BACKGROUND):
+                output = await self._handlers[kind](payload, attachment)
+            result = output.model_dump(mode="json")
+        except asyncio.CancelledError:
+            # Shutting down: leave the job as running so it is re-queued
+            raise
+        except Exception as e:
+            error = str(e)
+        finally:
+            self._running -= 1
+        await asyncio.to_thread(self.store.mark_finished, job_id, result, error)
+        self._completed += 1
+        if self._completed % 100 == 0:
+            await asyncio.to_thread(self.store.prune, time.time() - settings.JOBS_RESULT_TTL)
+
+    async def _run_case_analysis(self, payload: Dict[str, Any], attachment: Optional[bytes]):
+        return await AICaseService().comprehensive_analysis(ComprehensiveCaseInput(**payload))
+
+    async def _run_document(self, payload: Dict[str, Any], attachment: Optional[bytes]):
+        return await DocUploadService().process_document(
+            attachment, payload["filename"], payload.get("case_id"), payload.get("file_type")
+        )
+
+    async def _run_doc_generate(self, payload: Dict[str, Any], attachment: Optional[bytes]):
+        return await DocGenerateService().generate_legal_document(LegalDocsInput(**payload))
+
+
+job_queue = Lazy(JobQueue)
@@ -0,0 +1,237 @@
+# admission.py
+# app/services/shared/admission.py
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+# Expensive routes, by path prefix. Each worker process admits up to
+# ``max_concurrency`` requests per group, queues up to ``max_queue`` more
+# for at most ``queue_timeout`` seconds, and refuses the rest with a 503:
+# at once when the queue is full, so a client can retry elsewhere quickly.
+DEFAULT_LIMITS: Dict[str, Dict[str, Any]] = {
+    "ai_case": {
+        "paths": ("/api/ai/case",),
+        "max_concurrency": 16,
+        "max_queue": 32,
+        "queue_timeout": 2.0,
+    },
+    "upload_doc": {
+        "paths": ("/api/upload/doc",),
+        "max_concurrency": 8,
+        "max_queue": 16,
+        "queue_timeout": 2.0,
+    },
+    "upload_batch": {
+        "paths": ("/api/upload/batch",),
+        "max_concurrency": 2,
+        "max_queue": 4,
+        "queue_timeout": 2.0,
+    },
+    "doc_generate": {
+        "paths": ("/api/doc-generate/doc_generate",),
+        "max_concurrency": 8,
+        "max_queue": 16,
+        "queue_timeout": 2.0,
+    },
+}
+
+# Bounds for the Retry-After estimate, in seconds
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+# Weight of the latest request in the mean service time
+SERVICE_TIME_WEIGHT = 0.2
+
+
+class AdmissionLimit:
+    """Concurrency limit with a bounded FIFO wait queue for one route group"""
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.service_seconds = 0.0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def saturated(self) -> bool:
+        """True when the next request would be refused outright"""
+        return self.active >= self.max_concurrency and self.waiting >= self.max_queue
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free, from the mean service time"""
+        if not self.service_seconds:
+            # Nothing has finished yet; requests are at least this slow
+            estimate = self.queue_timeout
+        else:
+            estimate = self.service_seconds * (self.waiting + 1) / max(self.max_concurrency, 1)
+        return max(MIN_RETRY_AFTER, min(MAX_RETRY_AFTER, math.ceil(estimate)))
+
+    async def acquire(self) -> Optional[str]:
+        """Take a slot, waiting in line if needed; return the refusal reason instead if there is none"""
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return None
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            return "queue full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # Granted just as the deadline passed
+                self.admitted += 1
+                return None
+            waiter.cancel()
+            self._waiters.remove(waiter)
+            self.timed_out += 1
+            return "queue timeout"
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            raise
+        self.admitted += 1
+        return None
+
+    def release(self, seconds: Optional[float] = None) -> None:
+        """Free a slot, handing it straight to the longest waiter"""
+        if seconds is not None:
+            if self.service_seconds:
+                self.service_seconds += SERVICE_TIME_WEIGHT * (seconds - self.service_seconds)
+            else:
+                self.service_seconds = seconds
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "saturated": self.saturated,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "mean_seconds": round(self.service_seconds, 3),
+        }
+
+
+class AdmissionController:
+    """Per-route admission limits, from DEFAULT_LIMITS overridden by ``ADMISSION_LIMITS``.
+
+    Limits are per worker process; the load balancer sees each worker's
+    saturation through /ready.
+    """
+
+    def __init__(self):
+        self._limits: Optional[Dict[str, AdmissionLimit]] = None
+        self._prefixes: List[Tuple[str, AdmissionLimit]] = []
+
+    def _build(self) -> Dict[str, AdmissionLimit]:
+        if self._limits is None:
+            limits = {}
+            for name, defaults in DEFAULT_LIMITS.items():
+                config = {**defaults, **settings.ADMISSION_LIMITS.get(name, {})}
+                limit = AdmissionLimit(
+                    name,
+                    int(config["max_concurrency"]),
+                    int(config["max_queue"]),
+                    float(config["queue_timeout"]),
+                )
+                limits[name] = limit
+                self._prefixes.extend((prefix, limit) for prefix in config["paths"])
+            # Longest prefix first, so a specific route wins over a general one
+            self._prefixes.sort(key=lambda item: len(item[0]), reverse=True)
+            self._limits = limits
+        return self._limits
+
+    def limit_for(self, path: str) -> Optional[AdmissionLimit]:
+        self._build()
+        for prefix, limit in self._prefixes:
+            if path.startswith(prefix):
+                return limit
+        return None
+
+    @property
+    def saturated(self) -> bool:
+        return any(limit.saturated for limit in self._build().values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: limit.stats() for name, limit in self._build().items()}
+
+
+admission_controller = AdmissionController()
+
+
+class AdmissionMiddleware:
+    """Admit requests to limited routes or refuse them with a fast 503 and Retry-After.
+
+    A slot is held until the response has been sent in full, so streamed
+    analyses and batches count for as long as they run.
+    """
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope, receive, send):
+        limit = None
+        if scope["type"] == "http" and scope["method"] != "OPTIONS":
+            limit = self.controller.limit_for(scope["path"])
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        refused = await limit.acquire()
+        if refused is not None:
+            await self._reject(send, limit, refused)
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.release(time.perf_counter() - started)
+
+    async def _reject(self, send, limit: AdmissionLimit, reason: str) -> None:
+        body = json.dumps({"detail": f"Server busy ({reason}), try again later"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"retry-after", str(limit.retry_after()).encode("ascii")),
+                # Any upload body is left unread
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,362 @@
+# case_store.py
+# app/services/shared/case_store.py
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings, Lazy
+from app.models.ai_models import LegalProfile
+from app.models.case_models import CaseDocument, CaseMessage, CaseRecord
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS cases ("
+    "case_id TEXT PRIMARY KEY, prompt TEXT, legal_profile TEXT, analysis TEXT, "
+    "analyzed_documents INTEGER NOT NULL DEFAULT 0, revision INTEGER NOT NULL DEFAULT 0, "
+    "updated_at REAL NOT NULL, turn_key TEXT, turn_base INTEGER, turn_revision INTEGER)",
+    "CREATE TABLE IF NOT EXISTS case_documents ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, case_id TEXT NOT NULL, content_hash TEXT NOT NULL, "
+    "filename TEXT NOT NULL, document_type TEXT, legal_summary TEXT, extracted_text TEXT NOT NULL, "
+    "UNIQUE (case_id, content_hash))",
+    "CREATE TABLE IF NOT EXISTS case_messages ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, case_id TEXT NOT NULL, role TEXT NOT NULL, "
+    "content TEXT NOT NULL, created_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS case_messages_case_id ON case_messages (case_id)",
+    "CREATE INDEX IF NOT EXISTS cases_updated_at ON cases (updated_at)",
+)
+# Stores created before turns were deduplicated
+MIGRATIONS = (
+    "ALTER TABLE cases ADD COLUMN turn_key TEXT",
+    "ALTER TABLE cases ADD COLUMN turn_base INTEGER",
+    "ALTER TABLE cases ADD COLUMN turn_revision INTEGER",
+)
+
+
+class CaseNotFoundError(Exception):
+    """Raised when a follow-up names a case_id the store does not have"""
+
+
+class CaseStore:
+    """Per-case state so follow-up turns only carry the new message.
+
+    Holds each case's extracted documents, latest analysis and conversation
+    history in a local SQLite file, with an in-memory LRU of recently used
+    cases in front of it. Every write bumps the case's revision, and a
+    cached case is only served after checking its revision against the
+    file, so several worker processes can share one store. Cases untouched
+    for ``CASE_STORE_TTL`` seconds are removed.
+
+    Each case remembers the key of its latest turn, so a retried request can
+    be recognised: one that arrives after the turn was stored finds the case
+    still at that turn's revision, and one that raced it is dropped when it
+    tries to store the same turn on the same base revision.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        memory_items: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ):
+        self.path = path or settings.CASE_STORE_PATH
+        self.memory_items = memory_items if memory_items is not None else settings.CASE_STORE_MEMORY_ITEMS
+        self.ttl = ttl if ttl is not None else settings.CASE_STORE_TTL
+        self._memory: "OrderedDict[str, CaseRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            for statement in SCHEMA:
+                self._conn.execute(statement)
+            for statement in MIGRATIONS:
+                try:
+                    self._conn.execute(statement)
+                except sqlite3.OperationalError:
+                    pass
+        return self._conn
+
+    def _remember(self, record: CaseRecord) -> None:
+        self._memory[record.case_id] = record
+        self._memory.move_to_end(record.case_id)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _revision(self, case_id: str) -> Optional[int]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT revision FROM cases WHERE case_id = ? AND updated_at >= ?",
+                (case_id, time.time() - self.ttl),
+            ).fetchone()
+        return row[0] if row else None
+
+    def _load(self, case_id: str) -> Optional[CaseRecord]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT prompt, legal_profile, analysis, analyzed_documents, revision, turn_key, turn_revision "
+                "FROM cases WHERE case_id = ? AND updated_at >= ?",
+                (case_id, time.time() - self.ttl),
+            ).fetchone()
+            if row is None:
+                return None
+            documents = conn.execute(
+                "SELECT filename, extracted_text, document_type, legal_summary "
+                "FROM case_documents WHERE case_id = ? ORDER BY id",
+                (case_id,),
+            ).fetchall()
+            messages = conn.execute(
+                "SELECT role, content FROM case_messages WHERE case_id = ? ORDER BY id DESC LIMIT ?",
+                (case_id, settings.CASE_HISTORY_MESSAGES),
+            ).fetchall()
+        prompt, legal_profile, analysis, analyzed_documents, revision, turn_key, turn_revision = row
+        return CaseRecord(
+            case_id=case_id,
+            prompt=prompt,
+            legal_profile=LegalProfile.model_validate_json(legal_profile) if legal_profile else None,
+            analysis=json.loads(analysis) if analysis else None,
+            analyzed_documents=analyzed_documents,
+            documents=[
+                CaseDocument(filename=f, extracted_text=t, document_type=d, legal_summary=s)
+                for f, t, d, s in documents
+            ],
+            messages=[CaseMessage(role=r, content=c) for r, c in reversed(messages)],
+            revision=revision,
+            turn_key=turn_key,
+            turn_revision=turn_revision,
+        )
+
+    async def get(self, case_id: str) -> Optional[CaseRecord]:
+        """Return the stored case or None"""
+        record = self._memory.get(case_id)
+        revision = await asyncio.to_thread(self._revision, case_id)
+        if revision is None:
+            self._memory.pop(case_id, None)
+            self.misses += 1
+            return None
+        if record is not None and record.revision == revision:
+            self._memory.move_to_end(case_id)
+            self.memory_hits += 1
+            return record
+
+        record = await asyncio.to_thread(self._load, case_id)
+        if record is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self._remember(record)
+        return record
+
+    def _touch(self, conn: sqlite3.Connection, case_id: str, now: float) -> int:
+        """Create the case or bump its revision; return the new revision"""
+        return conn.execute(
+            "INSERT INTO cases (case_id, updated_at) VALUES (?, ?) "
+            "ON CONFLICT (case_id) DO UPDATE SET revision = revision + 1, updated_at = excluded.updated_at "
+            "RETURNING revision",
+            (case_id, now),
+        ).fetchone()[0]
+
+    def _apply(self, case_id: str, revision: int, update: Callable[[CaseRecord], Dict[str, Any]]) -> None:
+        """Bring a cached case up to our own write, or drop it if another write came in between.
+
+        Cached records are replaced rather than changed in place, since
+        callers may still be reading the previous one.
+        """
+        record = self._memory.get(case_id)
+        if record is None:
+            return
+        if record.revision != revision - 1:
+            del self._memory[case_id]
+            return
+        self._memory[case_id] = record.model_copy(update={**update(record), "revision": revision})
+
+    def _add_document(self, case_id: str, document: CaseDocument) -> Optional[int]:
+        content_hash = hashlib.sha256(document.extracted_text.encode("utf-8")).hexdigest()
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                existing = conn.execute(
+                    "SELECT document_type, legal_summary FROM case_documents WHERE case_id = ? AND content_hash = ?",
+                    (case_id, content_hash),
+                ).fetchone()
+                if existing is not None and (
+                    (document.document_type or existing[0], document.legal_summary or existing[1]) == tuple(existing)
+                ):
+                    # Resent unchanged (e.g. a retried request); leave the
+                    # revision alone so the retry is recognised
+                    return None
+                revision = self._touch(conn, case_id, now)
+                # The same text uploaded or resent again is stored once; a
+                # later analysis of it fills in the summary
+                conn.execute(
+                    "INSERT INTO case_documents "
+                    "(case_id, content_hash, filename, document_type, legal_summary, extracted_text) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (case_id, content_hash) DO UPDATE SET "
+                    "document_type = COALESCE(excluded.document_type, document_type), "
+                    "legal_summary = COALESCE(excluded.legal_summary, legal_summary)",
+                    (case_id, content_hash, document.filename, document.document_type,
+                     document.legal_summary, document.extracted_text),
+                )
+                self._delete_expired(conn, now)
+        return revision
+
+    def _record_turn(
+        self,
+        case_id: str,
+        prompt: Optional[str],
+        legal_profile: Optional[LegalProfile],
+        analysis: Dict[str, Any],
+        analyzed_documents: int,
+        message: Optional[str],
+        reply: Optional[str],
+        turn_key: Optional[str],
+        base_revision: Optional[int],
+    ) -> Optional[int]:
+        now = time.time()
+        base = -1 if base_revision is None else base_revision
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                # Take the write lock before reading, so racing retries in
+                # other processes see each other's turn
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT turn_key, turn_base FROM cases WHERE case_id = ?", (case_id,)
+                ).fetchone()
+                if turn_key is not None and row is not None and tuple(row) == (turn_key, base):
+                    return None
+                revision = self._touch(conn, case_id, now)
+                conn.execute(
+                    "UPDATE cases SET prompt = COALESCE(?, prompt), legal_profile = COALESCE(?, legal_profile), "
+                    "analysis = ?, analyzed_documents = MAX(analyzed_documents, ?), "
+                    "turn_key = ?, turn_base = ?, turn_revision = ? WHERE case_id = ?",
+                    (prompt, legal_profile.model_dump_json() if legal_profile else None,
+                     json.dumps(analysis), analyzed_documents, turn_key, base, revision, case_id),
+                )
+                for role, content in (("user", message), ("assistant", reply)):
+                    if content:
+                        conn.execute(
+                            "INSERT INTO case_messages (case_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                            (case_id, role, content, now),
+                        )
+        return revision
+
+    def _delete_expired(self, conn: sqlite3.Connection, now: float) -> None:
+        expired = [row[0] for row in conn.execute(
+            "SELECT case_id FROM cases WHERE updated_at < ?", (now - self.ttl,)
+        )]
+        for case_id in expired:
+            for table in ("case_documents", "case_messages", "cases"):
+                conn.execute(f"DELETE FROM {table} WHERE case_id = ?", (case_id,))
+
+    async def add_document(
+        self,
+        case_id: str,
+        filename: str,
+        extracted_text: str,
+        document_type: Optional[str] = None,
+        legal_summary: Optional[str] = None,
+    ) -> None:
+        """Attach a document's text (and its analysis, if any) to a case, creating the case"""
+        document = CaseDocument(
+            filename=filename,
+            extracted_text=extracted_text,
+            document_type=document_type,
+            legal_summary=legal_summary,
+        )
+        revision = await asyncio.to_thread(self._add_document, case_id, document)
+        if revision is None:
+            return
+
+        def update(record: CaseRecord) -> Dict[str, Any]:
+            documents = list(record.documents)
+            for index, existing in enumerate(documents):
+                if existing.extracted_text == document.extracted_text:
+                    documents[index] = existing.model_copy(update={
+                        "document_type": document.document_type or existing.document_type,
+                        "legal_summary": document.legal_summary or existing.legal_summary,
+                    })
+                    break
+            else:
+                documents.append(document)
+            return {"documents": documents}
+
+        self._apply(case_id, revision, update)
+
+    async def record_turn(
+        self,
+        case_id: str,
+        analysis: Dict[str, Any],
+        analyzed_documents: int,
+        prompt: Optional[str] = None,
+        legal_profile: Optional[LegalProfile] = None,
+        message: Optional[str] = None,
+        reply: Optional[str] = None,
+        turn_key: Optional[str] = None,
+        base_revision: Optional[int] = None,
+    ) -> None:
+        """Store a case analysis and the exchange that produced it.
+
+        ``analyzed_documents`` is how many of the case's documents the
+        analysis covered; ``prompt`` and ``legal_profile`` replace the stored
+        ones when given. ``turn_key`` identifies the request and
+        ``base_revision`` is the case revision it was answered from (None for
+        a new case); a turn already stored with both is not stored again.
+        """
+        revision = await asyncio.to_thread(
+            self._record_turn, case_id, prompt, legal_profile, analysis, analyzed_documents, message, reply,
+            turn_key, base_revision
+        )
+        if revision is None:
+            return
+
+        def update(record: CaseRecord) -> Dict[str, Any]:
+            messages = record.messages + [
+                CaseMessage(role=role, content=content)
+                for role, content in (("user", message), ("assistant", reply)) if content
+            ]
+            return {
+                "prompt": prompt or record.prompt,
+                "legal_profile": legal_profile or record.legal_profile,
+                "analysis": analysis,
+                "analyzed_documents": max(record.analyzed_documents, analyzed_documents),
+                "messages": messages[-settings.CASE_HISTORY_MESSAGES:],
+                "turn_key": turn_key,
+                "turn_revision": revision,
+            }
+
+        self._apply(case_id, revision, update)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_items": len(self._memory),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+case_store = Lazy(CaseStore)
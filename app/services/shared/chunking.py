@@ -0,0 +1,98 @@
+# chunking.py
+# app/services/shared/chunking.py
+import re
+from typing import List
+
+# Rough tokens-per-character ratio for English legal prose with llama tokenizers
+CHARS_PER_TOKEN = 4
+
+# Lines that usually open a new section of a legal document
+_HEADING = re.compile(
+    r"^\s*("
+    r"(?i:section|article|clause|part|schedule|exhibit)\s+[\w.]+"
+    r"|\d+(\.\d+)*[.)]\s+\S"
+    # All-caps titles only; prose lines start with a capital too
+    r"|[A-Z][A-Z0-9 ,.'&()-]{3,}$"
+    r")"
+)
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for prompt budgeting"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _split_sections(text: str) -> List[str]:
+    sections: List[List[str]] = [[]]
+    for line in text.splitlines():
+        if _HEADING.match(line) and any(part.strip() for part in sections[-1]):
+            sections.append([])
+        sections[-1].append(line)
+    return ["\n".join(lines).strip() for lines in sections if any(l.strip() for l in lines)]
+
+
+def _split_to_budget(text: str, max_tokens: int) -> List[str]:
+    """Break one oversized unit at paragraph, then sentence, then character level"""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    for splitter in (_PARAGRAPH_BREAK, _SENTENCE_END):
+        parts = [part.strip() for part in splitter.split(text) if part.strip()]
+        if len(parts) > 1:
+            units: List[str] = []
+            for part in parts:
+                units.extend(_split_to_budget(part, max_tokens))
+            return units
+
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """Split ``text`` into chunks of at most ``max_tokens`` estimated tokens.
+
+    Sections are kept whole where they fit; otherwise they are broken at
+    paragraph and then sentence boundaries. Adjacent small units are packed
+    together so chunks stay close to the budget.
+    """
+    units: List[str] = []
+    for section in _split_sections(text):
+        units.extend(_split_to_budget(section, max_tokens))
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for unit in units:
+        unit_tokens = estimate_tokens(unit) + 1
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current = []
+            current_tokens = 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def group_pieces(pieces: List[str], max_tokens: int) -> List[List[str]]:
+    """Pack consecutive ``pieces`` into groups of at most ``max_tokens`` estimated tokens.
+
+    Pieces are never split; one larger than the budget forms a group of its own.
+    """
+    groups: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for piece in pieces:
+        piece_tokens = estimate_tokens(piece) + 1
+        if current and current_tokens + piece_tokens > max_tokens:
+            groups.append(current)
+            current = []
+            current_tokens = 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        groups.append(current)
+    return groups
@@ -0,0 +1,239 @@
+# completion_cache.py
+# app/services/shared/completion_cache.py
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings, Lazy
+
+
+class MemoryCompletionBackend:
+    """In-process LRU of completions with per-entry expiry"""
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._items: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at < time.time():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        await self.set_until(key, value, time.time() + ttl)
+
+    async def set_until(self, key: str, value: str, expires_at: float) -> None:
+        self._items[key] = (value, expires_at)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class SQLiteCompletionBackend:
+    """Local SQLite store so cached completions survive restarts"""
+
+    def __init__(self, path: str, max_rows: int):
+        self.path = path
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS completions_expires_at ON completions (expires_at)"
+            )
+        return self._conn
+
+    def _get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value, expires_at FROM completions WHERE key = ? AND expires_at >= ?",
+                (key, time.time()),
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def _set(self, key: str, value: str, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO completions (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, now + ttl),
+                )
+                conn.execute("DELETE FROM completions WHERE expires_at < ?", (now,))
+                # Trim the soonest-to-expire rows once over the row quota
+                conn.execute(
+                    "DELETE FROM completions WHERE key IN ("
+                    "SELECT key FROM completions ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_rows,),
+                )
+
+    async def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """The cached value and its expiry time, if present and fresh"""
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class CompletionCache:
+    """Two-tier LLM completion cache with in-flight request coalescing.
+
+    Lookups go to the memory tier first and then to the optional SQLite
+    tier. Identical requests that arrive while an upstream call is still
+    running share that call instead of issuing their own; the call is
+    cancelled once every caller waiting on it has been.
+    """
+
+    def __init__(
+        self,
+        memory: Optional[MemoryCompletionBackend] = None,
+        disk: Optional[SQLiteCompletionBackend] = None,
+    ):
+        self.memory = memory or MemoryCompletionBackend(settings.COMPLETION_CACHE_MEMORY_ITEMS)
+        self.disk = disk
+        if self.disk is None and settings.COMPLETION_CACHE_SQLITE_PATH:
+            self.disk = SQLiteCompletionBackend(
+                settings.COMPLETION_CACHE_SQLITE_PATH,
+                settings.COMPLETION_CACHE_SQLITE_MAX_ROWS,
+            )
+        self._inflight: Dict[str, "asyncio.Task[str]"] = {}
+        self._waiters: Dict["asyncio.Task[str]", int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(**params: Any) -> str:
+        """Hash the request parameters that determine a completion"""
+        payload = json.dumps(params, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, temperature: float, ttl: Optional[float]) -> bool:
+        """Whether a call with these settings may be served from cache"""
+        if not settings.COMPLETION_CACHE_ENABLED:
+            return False
+        if ttl is not None and ttl <= 0:
+            return False
+        return temperature <= settings.COMPLETION_CACHE_MAX_TEMPERATURE
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.memory.get(key)
+        if value is None and self.disk is not None:
+            try:
+                item = await self.disk.get(key)
+            except Exception as e:
+                print(f"Error reading completion cache: {str(e)}")
+                item = None
+            if item is not None:
+                # Keep the entry's own expiry rather than restarting its TTL
+                value, expires_at = item
+                await self.memory.set_until(key, value, expires_at)
+        return value
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        await self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            try:
+                await self.disk.set(key, value, ttl)
+            except Exception as e:
+                print(f"Error writing completion cache: {str(e)}")
+
+    async def get_or_compute(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[str]],
+        ttl: Optional[float] = None,
+    ) -> str:
+        """Return a cached completion, joining or starting the upstream call"""
+        if ttl is None:
+            ttl = settings.COMPLETION_CACHE_TTL
+
+        value = await self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._compute(key, factory, ttl))
+            # Mark failures as retrieved even if every waiter was cancelled
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+
+        # Shield so one cancelled caller does not abort the shared call, but
+        # stop the call (and free its upstream slot) when nobody is left waiting
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    async def _compute(self, key: str, factory: Callable[[], Awaitable[str]], ttl: float) -> str:
+        try:
+            value = await factory()
+            await self.set(key, value, ttl)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/coalescing counters"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "memory_items": len(self.memory),
+            "inflight": len(self._inflight),
+            "disk_enabled": self.disk is not None,
+        }
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
+
+
+completion_cache = Lazy(CompletionCache)
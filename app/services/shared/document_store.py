@@ -0,0 +1,196 @@
+# document_store.py
+# app/services/shared/document_store.py
+import asyncio
+import hashlib
+import os
+import re
+import time
+from typing import Any, Dict, Optional
+
+import aiofiles
+
+from app.core.config import settings, Lazy
+
+KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class DocumentStore:
+    """Sharded, content-keyed store for generated documents.
+
+    Files live under ``<directory>/<k[:2]>/<k[2:4]>/<key><ext>`` so no single
+    directory grows unbounded. Keys are derived from whatever determines the
+    output, so regenerating an identical document reuses the stored file. A
+    background sweeper expires files past their TTL, trims the store back
+    under its byte quota oldest first, and clears orphaned upload temp files.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sweep_interval: Optional[float] = None,
+        temp_directory: Optional[str] = None,
+        temp_ttl: Optional[float] = None,
+    ):
+        self.directory = directory or settings.DOCUMENT_STORE_DIR
+        self.ttl = ttl if ttl is not None else settings.DOCUMENT_STORE_TTL
+        self.max_bytes = max_bytes if max_bytes is not None else settings.DOCUMENT_STORE_MAX_BYTES
+        self.sweep_interval = sweep_interval if sweep_interval is not None else settings.DOCUMENT_STORE_SWEEP_INTERVAL
+        self.temp_directory = temp_directory or settings.UPLOAD_TEMP_DIR
+        self.temp_ttl = temp_ttl if temp_ttl is not None else settings.UPLOAD_TEMP_TTL
+        self._sweeper: Optional[asyncio.Task] = None
+        self.stored = 0
+        self.deduplicated = 0
+        self.expired = 0
+        self.evicted = 0
+        self.temp_removed = 0
+        self.disk_bytes: Optional[int] = None
+        self.last_sweep: Optional[float] = None
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Build a store key from the inputs that determine a document"""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    @staticmethod
+    def is_valid_key(key: str) -> bool:
+        return bool(KEY_PATTERN.match(key))
+
+    def path(self, key: str, ext: str = ".docx") -> str:
+        return os.path.join(self.directory, key[:2], key[2:4], f"{key}{ext}")
+
+    async def exists(self, key: str, ext: str = ".docx") -> bool:
+        """Return True if ``key`` is stored, refreshing its age so the sweeper keeps it"""
+        path = self.path(key, ext)
+        try:
+            await asyncio.to_thread(os.utime, path)
+        except OSError:
+            return False
+        self.deduplicated += 1
+        return True
+
+    async def put(self, key: str, data: bytes, ext: str = ".docx") -> str:
+        """Store ``data`` under ``key`` and return its path"""
+        path = self.path(key, ext)
+        await asyncio.to_thread(os.makedirs, os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        async with aiofiles.open(tmp_path, 'wb') as f:
+            await f.write(data)
+        os.replace(tmp_path, path)
+        self.stored += 1
+        if self.disk_bytes is not None:
+            self.disk_bytes += len(data)
+        return path
+
+    def sweep(self) -> None:
+        """Expire old documents, enforce the byte quota and clear stale temp files"""
+        now = time.time()
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                # Leftover partial writes are orphans, so they age out like temp files
+                ttl = self.temp_ttl if name.endswith(".tmp") else self.ttl
+                if now - stat.st_mtime > ttl:
+                    if self._remove(path):
+                        self.expired += 1
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if total > self.max_bytes:
+            entries.sort()
+            for _, size, path in entries:
+                if self._remove(path):
+                    self.evicted += 1
+                    total -= size
+                if total <= self.max_bytes:
+                    break
+
+        self._prune_empty_dirs(self.directory)
+        self.temp_removed += self._sweep_temp(now)
+        self.disk_bytes = total
+        self.last_sweep = now
+
+    def _sweep_temp(self, now: float) -> int:
+        removed = 0
+        try:
+            names = os.listdir(self.temp_directory)
+        except OSError:
+            return 0
+        for name in names:
+            path = os.path.join(self.temp_directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if os.path.isfile(path) and now - stat.st_mtime > self.temp_ttl and self._remove(path):
+                removed += 1
+        return removed
+
+    def _prune_empty_dirs(self, directory: str) -> None:
+        # Bottom-up, so a shard whose only subdirectory was just removed goes too;
+        # rmdir refuses non-empty directories
+        for root, _, files in os.walk(directory, topdown=False):
+            if root != directory and not files:
+                try:
+                    os.rmdir(root)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                print(f"Error sweeping document store: {str(e)}")
+            await asyncio.sleep(self.sweep_interval)
+
+    def startup(self) -> None:
+        """Start the background sweeper"""
+        os.makedirs(self.directory, exist_ok=True)
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop(), name="document-store-sweeper")
+
+    async def shutdown(self) -> None:
+        """Stop the background sweeper"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Storage counters"""
+        return {
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "temp_removed": self.temp_removed,
+            "disk_bytes": self.disk_bytes,
+            "last_sweep": self.last_sweep,
+        }
+
+
+document_store = Lazy(DocumentStore)
@@ -0,0 +1,101 @@
+# downloads.py
+# app/services/shared/downloads.py
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+import aiofiles
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, Response
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Return the inclusive byte span for a single-range header, or None to send everything.
+
+    Multi-range and malformed headers fall back to a full response, which
+    RFC 9110 allows. Raises 416 when the range lies outside the file.
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.group(0) == "bytes=-":
+        return None
+    start, end = match.groups()
+    if start:
+        first = int(start)
+        last = min(int(end), size - 1) if end else size - 1
+    else:
+        # Suffix range: the last N bytes
+        first = max(size - int(end), 0)
+        last = size - 1
+    if first > last or first >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return first, last
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+async def file_download_response(
+    request: Request,
+    path: str,
+    etag: str,
+    filename: str,
+    media_type: str,
+    max_age: int = 0,
+) -> Response:
+    """Serve ``path`` with ETag, conditional-GET and single-range support.
+
+    ``etag`` must identify the file's content; it is quoted here.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise HTTPException(status_code=404, detail="Document not found or expired")
+
+    etag = f'"{etag}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": f"private, max-age={max_age}",
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}",
+    }
+
+    if _not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header:
+        # Only honour the range if the client's copy is still current
+        if_range = request.headers.get("if-range")
+        if if_range is None or if_range.strip() == etag:
+            byte_range = _parse_range(range_header, stat.st_size)
+
+    if byte_range is None:
+        return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat)
+
+    first, last = byte_range
+    async with aiofiles.open(path, 'rb') as f:
+        await f.seek(first)
+        body = await f.read(last - first + 1)
+    headers["Content-Range"] = f"bytes {first}-{last}/{stat.st_size}"
+    return Response(content=body, status_code=206, media_type=media_type, headers=headers)
@@ -0,0 +1,121 @@
+# executor.py
+# app/services/shared/executor.py
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+from app.core.config import settings
+
+PROCESS = "process"
+THREAD = "thread"
+
+
+def _noop() -> None:
+    return None
+
+
+class ExecutionEngine:
+    """Runs blocking extraction work off the event loop.
+
+    CPU-bound jobs (PDF parsing, OCR) go to a process pool so they do not
+    contend for the GIL; lighter I/O-ish jobs (DOCX) go to a thread pool.
+    Each pool tracks how many jobs are queued or running.
+    """
+
+    def __init__(self):
+        self._pools: Dict[str, Executor] = {}
+        self._pending: Dict[str, int] = {PROCESS: 0, THREAD: 0}
+
+    def _get_pool(self, kind: str) -> Executor:
+        pool = self._pools.get(kind)
+        if pool is None:
+            if kind == PROCESS:
+                pool = ProcessPoolExecutor(max_workers=settings.EXTRACTION_PROCESS_WORKERS)
+            elif kind == THREAD:
+                pool = ThreadPoolExecutor(
+                    max_workers=settings.EXTRACTION_THREAD_WORKERS,
+                    thread_name_prefix="extract",
+                )
+            else:
+                raise ValueError(f"Unknown executor kind: {kind}")
+            self._pools[kind] = pool
+        return pool
+
+    async def run(
+        self,
+        kind: str,
+        func: Callable[..., Any],
+        *args: Any,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Run ``func(*args)`` on the given pool and await its result"""
+        if timeout is None:
+            timeout = settings.EXTRACTION_TIMEOUT
+        loop = asyncio.get_running_loop()
+        future = self._get_pool(kind).submit(func, *args)
+        self._pending[kind] += 1
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future, loop=loop), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Extraction job exceeded {timeout} seconds")
+        finally:
+            # Drops the job if it has not started yet; a running job
+            # finishes in the background and its result is discarded.
+            future.cancel()
+            self._pending[kind] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and worker counts per pool"""
+        return {
+            PROCESS: {
+                "workers": settings.EXTRACTION_PROCESS_WORKERS,
+                "pending": self._pending[PROCESS],
+            },
+            THREAD: {
+                "workers": settings.EXTRACTION_THREAD_WORKERS,
+                "pending": self._pending[THREAD],
+            },
+        }
+
+    async def warm_up(self, kind: str, func: Callable[[], Any]) -> None:
+        """Run ``func`` once per worker so per-process state is loaded up front"""
+        workers = settings.EXTRACTION_PROCESS_WORKERS if kind == PROCESS else settings.EXTRACTION_THREAD_WORKERS
+        await asyncio.gather(
+            *(self.run(kind, func) for _ in range(workers)),
+            return_exceptions=True,
+        )
+
+    def startup(self) -> None:
+        """Create the worker pools up front"""
+        for kind in (PROCESS, THREAD):
+            self._get_pool(kind)
+        # Fork the process workers now, before lazily imported libraries can
+        # be mid-import on a worker thread (a child forked then can deadlock)
+        self._pools[PROCESS].submit(_noop)
+
+    def shutdown(self) -> None:
+        """Stop the worker pools, dropping queued jobs"""
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        self._pools.clear()
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[Any], poll_interval: float = 0.5) -> Any:
+    """Await ``awaitable`` but cancel it if the HTTP client goes away"""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+execution_engine = ExecutionEngine()
@@ -0,0 +1,139 @@
+# extraction_cache.py
+# app/services/shared/extraction_cache.py
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import aiofiles
+
+from app.core.config import settings, Lazy
+
+
+class ExtractionCache:
+    """Content-addressed cache for extracted document text.
+
+    Entries are keyed by the SHA-256 of the uploaded bytes plus the file
+    type and extractor version, so re-uploading the same file skips OCR and
+    parsing entirely. A small in-memory LRU sits in front of an on-disk store
+    that is trimmed back under its byte quota, oldest entries first.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        memory_items: Optional[int] = None,
+        max_disk_bytes: Optional[int] = None,
+    ):
+        self.directory = directory or settings.EXTRACTION_CACHE_DIR
+        self.memory_items = memory_items if memory_items is not None else settings.EXTRACTION_CACHE_MEMORY_ITEMS
+        self.max_disk_bytes = max_disk_bytes if max_disk_bytes is not None else settings.EXTRACTION_CACHE_MAX_BYTES
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._disk_bytes: Optional[int] = None
+        self._evict_lock = asyncio.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(file_content: bytes, file_ext: str, version: str) -> str:
+        """Build the cache key for an upload"""
+        digest = hashlib.sha256(file_content).hexdigest()
+        return f"{digest}-{file_ext.lstrip('.').lower()}-v{version}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.txt")
+
+    def _remember(self, key: str, text: str) -> None:
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return cached text for ``key`` or None"""
+        text = self._memory.get(key)
+        if text is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return text
+
+        path = self._path(key)
+        try:
+            async with aiofiles.open(path, 'r', encoding='utf-8') as f:
+                text = await f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        # Touch the file so disk eviction treats it as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._remember(key, text)
+        self.disk_hits += 1
+        return text
+
+    async def set(self, key: str, text: str) -> None:
+        """Store extracted text under ``key``"""
+        self._remember(key, text)
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            async with aiofiles.open(tmp_path, 'w', encoding='utf-8') as f:
+                await f.write(text)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error writing extraction cache entry {key}: {str(e)}")
+            return
+
+        if self._disk_bytes is not None:
+            self._disk_bytes += os.path.getsize(path)
+        if self._disk_bytes is None or self._disk_bytes > self.max_disk_bytes:
+            async with self._evict_lock:
+                self._disk_bytes = await asyncio.to_thread(self._evict)
+
+    def _evict(self) -> int:
+        """Delete least recently used files until under quota; return disk usage"""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if total > self.max_disk_bytes:
+            entries.sort()
+            for _, size, path in entries:
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.max_disk_bytes:
+                    break
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_items": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+        }
+
+
+extraction_cache = Lazy(ExtractionCache)
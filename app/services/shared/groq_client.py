@@ -1,13 +1,90 @@
 # groq_client.py
 # app/services/shared/groq_client.py
-import os
-from groq import Groq
-from typing import Optional, Dict, Any
+import asyncio
+from typing import TYPE_CHECKING, Optional, Dict, Any, List, AsyncIterator
 import json
+import time
+
+from app.core.config import settings
+from app.services.shared.completion_cache import completion_cache
+from app.services.shared.rate_limiter import rate_limiter, parse_retry_after
+from app.services.shared.chunking import estimate_tokens
+from app.services.shared.metrics import stage, LLM_SECONDS, LLM_TOKENS
+
+if TYPE_CHECKING:
+    import httpx
+    from groq import AsyncGroq
 
 class GroqClient:
-    def __init__(self):
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+    """Thin per-service handle onto a single process-wide async Groq client.
+
+    The underlying ``AsyncGroq`` instance and its ``httpx.AsyncClient`` pool are
+    shared by every ``GroqClient``, so creating one per request is cheap and all
+    requests reuse the same keep-alive connections. httpx and the groq SDK are
+    imported when the pool is first opened.
+    """
+
+    _client: Optional["AsyncGroq"] = None
+    _http_client: Optional["httpx.AsyncClient"] = None
+    _semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def client(self) -> "AsyncGroq":
+        return self._get_client()
+
+    @classmethod
+    def _get_client(cls) -> "AsyncGroq":
+        """Return the shared client, creating the pool on first use"""
+        if cls._client is None:
+            import httpx
+            from groq import AsyncGroq
+
+            cls._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.GROQ_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.GROQ_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.GROQ_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(
+                    settings.GROQ_TIMEOUT, connect=settings.GROQ_CONNECT_TIMEOUT
+                ),
+            )
+            # Retries are handled here so they go through the rate limiter
+            cls._client = AsyncGroq(
+                api_key=settings.GROQ_API_KEY,
+                base_url=settings.GROQ_BASE_URL,
+                http_client=cls._http_client,
+                max_retries=0,
+            )
+            cls._semaphore = asyncio.Semaphore(settings.GROQ_MAX_CONCURRENCY)
+        return cls._client
+
+    @classmethod
+    async def startup(cls) -> None:
+        """Open the shared connection pool"""
+        cls._get_client()
+
+    @classmethod
+    async def connect(cls) -> None:
+        """Open a keep-alive connection to the API so the first call skips the TLS handshake"""
+        client = cls._get_client()
+        # Listing models is free and also checks the API key
+        response = await cls._http_client.get(
+            client.base_url.join("/openai/v1/models"),
+            headers={"Authorization": f"Bearer {settings.GROQ_API_KEY}"},
+        )
+        if response.status_code >= 400:
+            raise Exception(f"Groq API returned {response.status_code} while connecting")
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        """Close the shared connection pool"""
+        completion_cache.close()
+        if cls._http_client is not None:
+            await cls._http_client.aclose()
+        cls._client = None
+        cls._http_client = None
+        cls._semaphore = None
         
     async def generate_response(
         self, 
@@ -15,9 +92,18 @@ class GroqClient:
         system_prompt: Optional[str] = None,
         model: str = "llama3-8b-8192",
         max_tokens: int = 1000,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        cache_ttl: Optional[float] = None,
+        json_mode: bool = False,
+        max_retries: Optional[int] = None
     ) -> str:
-        """Generate a response using Groq API"""
+        """Generate a response using Groq API.
+
+        Identical calls are served from the completion cache for ``cache_ttl``
+        seconds (the configured default when None); pass ``cache_ttl=0`` to
+        always hit the API. ``json_mode`` asks the API for a JSON object.
+        ``max_retries`` overrides ``GROQ_MAX_RETRIES`` for this call.
+        """
         try:
             messages = []
             
@@ -25,18 +111,213 @@ class GroqClient:
                 messages.append({"role": "system", "content": system_prompt})
             
             messages.append({"role": "user", "content": prompt})
-            
-            response = self.client.chat.completions.create(
+
+            if not completion_cache.is_cacheable(temperature, cache_ttl):
+                return await self._create_completion(model, messages, max_tokens, temperature, json_mode, max_retries)
+
+            key = completion_cache.make_key(
                 model=model,
                 messages=messages,
                 max_tokens=max_tokens,
-                temperature=temperature
+                temperature=temperature,
+                json_mode=json_mode,
+            )
+            return await completion_cache.get_or_compute(
+                key,
+                lambda: self._create_completion(model, messages, max_tokens, temperature, json_mode, max_retries),
+                ttl=cache_ttl,
             )
             
-            return response.choices[0].message.content
+        except Exception as e:
+            raise Exception(f"Groq API error: {str(e)}") from e
+
+    async def _create_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        json_mode: bool = False,
+        max_retries: Optional[int] = None
+    ) -> str:
+        """Issue a chat completion request, queueing and retrying within rate limits.
+
+        Attempts and the backoff between them share ``GROQ_TOTAL_TIMEOUT``;
+        time spent queued for rate-limit budget is not counted against it.
+        """
+        from groq import APIConnectionError, InternalServerError, RateLimitError
+
+        client = self.client
+        extra = {"response_format": {"type": "json_object"}} if json_mode else {}
+        estimated_tokens = self._estimate_tokens(messages, max_tokens)
+        if max_retries is None:
+            max_retries = settings.GROQ_MAX_RETRIES
+        attempt = 0
+        spent = 0.0
+        while True:
+            with stage("groq", "rate_limit_wait"):
+                await rate_limiter.acquire(estimated_tokens)
+            try:
+                async with self._semaphore:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.chat.completions.create(
+                            model=model,
+                            messages=messages,
+                            max_tokens=max_tokens,
+                            temperature=temperature,
+                            timeout=min(settings.GROQ_TIMEOUT, settings.GROQ_TOTAL_TIMEOUT - spent),
+                            **extra
+                        )
+                    except Exception as e:
+                        spent += time.perf_counter() - started
+                        LLM_SECONDS.observe(time.perf_counter() - started, model, type(e).__name__)
+                        raise
+                    LLM_SECONDS.observe(time.perf_counter() - started, model, "ok")
+            except (RateLimitError, InternalServerError, APIConnectionError) as e:
+                attempt += 1
+                if attempt > max_retries:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                # Give up rather than retry with no time left for the attempt
+                if spent + delay + settings.GROQ_CONNECT_TIMEOUT >= settings.GROQ_TOTAL_TIMEOUT:
+                    raise
+                rate_limiter.retries += 1
+                await asyncio.sleep(delay)
+                spent += delay
+                continue
             
+            if response.usage is not None:
+                rate_limiter.release(estimated_tokens, response.usage.total_tokens)
+                self._record_usage(model, response.usage)
+            return response.choices[0].message.content
+
+    @staticmethod
+    def _usage_count(usage: Any, name: str) -> int:
+        """A token count from a usage object, or the plain dict a stream chunk carries"""
+        value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+        return value or 0
+
+    @classmethod
+    def _record_usage(cls, model: str, usage: Any) -> None:
+        LLM_TOKENS.inc(model, "prompt", amount=cls._usage_count(usage, "prompt_tokens"))
+        LLM_TOKENS.inc(model, "completion", amount=cls._usage_count(usage, "completion_tokens"))
+
+    @staticmethod
+    def _stream_usage(chunk: Any) -> Any:
+        """Usage reported in a stream chunk: OpenAI-style ``usage`` or Groq's ``x_groq.usage``"""
+        usage = getattr(chunk, "usage", None)
+        if usage is None:
+            x_groq = getattr(chunk, "x_groq", None)
+            if isinstance(x_groq, dict):
+                usage = x_groq.get("usage")
+            elif x_groq is not None:
+                usage = getattr(x_groq, "usage", None)
+        return usage
+
+    @staticmethod
+    def _estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+        """Upper bound on tokens a request can consume, for rate budgeting"""
+        return sum(estimate_tokens(m["content"]) for m in messages) + max_tokens
+
+    @staticmethod
+    def _retry_delay(error: Exception, attempt: int) -> float:
+        """How long to wait before retrying after ``error``"""
+        response = getattr(error, "response", None)
+        retry_after = parse_retry_after(response.headers if response is not None else None)
+        delay = rate_limiter.backoff_delay(attempt, retry_after)
+        from groq import RateLimitError
+
+        if isinstance(error, RateLimitError):
+            # Hold everyone back, not just this caller
+            rate_limiter.pause(delay)
+        return delay
+    
+    async def stream_response(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        model: str = "llama3-8b-8192",
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        cache_ttl: Optional[float] = None,
+        json_mode: bool = False
+    ) -> AsyncIterator[str]:
+        """Yield response text as the model produces it.
+
+        A cached completion is yielded in one piece; a freshly streamed one is
+        stored in the completion cache once it finishes.
+        """
+        messages = []
+        
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        
+        messages.append({"role": "user", "content": prompt})
+
+        key = None
+        if completion_cache.is_cacheable(temperature, cache_ttl):
+            key = completion_cache.make_key(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                json_mode=json_mode,
+            )
+            cached = await completion_cache.get(key)
+            if cached is not None:
+                completion_cache.hits += 1
+                yield cached
+                return
+
+        client = self.client
+        extra = {"response_format": {"type": "json_object"}} if json_mode else {}
+        estimated_tokens = self._estimate_tokens(messages, max_tokens)
+        parts = []
+        used_tokens = None
+        try:
+            with stage("groq", "rate_limit_wait"):
+                await rate_limiter.acquire(estimated_tokens)
+            try:
+                async with self._semaphore:
+                    started = time.perf_counter()
+                    stream = await client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        stream=True,
+                        timeout=min(settings.GROQ_TIMEOUT, settings.GROQ_TOTAL_TIMEOUT),
+                        **extra
+                    )
+                    async for chunk in stream:
+                        usage = self._stream_usage(chunk)
+                        if usage is not None:
+                            self._record_usage(model, usage)
+                            used_tokens = self._usage_count(usage, "total_tokens")
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            parts.append(delta)
+                            yield delta
+                    LLM_SECONDS.observe(time.perf_counter() - started, model, "ok")
+            finally:
+                # Without reported usage (a failed or abandoned stream), count
+                # the prompt and what was generated before it stopped
+                if used_tokens is None:
+                    used_tokens = self._estimate_tokens(messages, 0) + estimate_tokens("".join(parts))
+                rate_limiter.release(estimated_tokens, used_tokens)
         except Exception as e:
-            raise Exception(f"Groq API error: {str(e)}")
+            raise Exception(f"Groq API error: {str(e)}") from e
+
+        if key is not None:
+            completion_cache.misses += 1
+            await completion_cache.set(
+                key,
+                "".join(parts),
+                cache_ttl if cache_ttl is not None else settings.COMPLETION_CACHE_TTL,
+            )
     
     async def analyze_legal_document(self, text: str) -> Dict[str, Any]:
         """Analyze legal document and extract key information"""
@@ -52,7 +333,8 @@ class GroqClient:
         response = await self.generate_response(
             prompt=f"Analyze this legal document:\n\n{text}",
             system_prompt=system_prompt,
-            max_tokens=1500
+            max_tokens=1500,
+            cache_ttl=settings.COMPLETION_CACHE_TTL_DOCUMENT
         )
         
         return {"analysis": response}
@@ -81,7 +363,8 @@ class GroqClient:
         response = await self.generate_response(
             prompt=prompt,
             system_prompt=system_prompt,
-            max_tokens=1500
+            max_tokens=1500,
+            cache_ttl=settings.COMPLETION_CACHE_TTL_SUMMARY
         )
         
         return {"summary": response}
\ No newline at end of file
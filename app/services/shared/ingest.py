@@ -0,0 +1,140 @@
+# ingest.py
+# app/services/shared/ingest.py
+import json
+from typing import Dict, Optional
+
+from fastapi import HTTPException, UploadFile
+
+# Leading bytes of each supported binary format
+_SIGNATURES = (
+    (b"%PDF-", ".pdf"),
+    (b"PK\x03\x04", ".docx"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"BM", ".bmp"),
+    (b"II*\x00", ".tiff"),
+    (b"MM\x00*", ".tiff"),
+)
+
+SNIFF_BYTES = 512
+READ_CHUNK_SIZE = 64 * 1024
+
+# Allowance for multipart boundaries and small form fields on top of the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLargeError(HTTPException):
+    """Raised as soon as an upload crosses the configured size limit"""
+
+    def __init__(self, max_size: int):
+        super().__init__(
+            status_code=400,
+            detail=f"File size too large. Maximum size: {max_size} bytes",
+        )
+
+
+def sniff_file_type(head: bytes) -> Optional[str]:
+    """Guess the file extension from the first bytes of an upload"""
+    for signature, ext in _SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    if not head or b"\x00" in head:
+        return None
+    try:
+        # A multi-byte character may be cut at the end of the sample
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        if e.start < len(head) - 3:
+            return None
+    return ".txt"
+
+
+async def read_upload(file: UploadFile, max_size: int) -> bytes:
+    """Read an upload in chunks, failing fast once it exceeds ``max_size``"""
+    chunks = []
+    total = 0
+    while True:
+        chunk = await file.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_size:
+            raise UploadTooLargeError(max_size)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+class UploadSizeLimitMiddleware:
+    """Reject oversize request bodies on upload routes before they are spooled.
+
+    Requests announcing a larger ``Content-Length`` are refused outright;
+    chunked bodies are counted as they stream in and cut off once they
+    cross the limit.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        # Path prefix -> maximum upload size in bytes
+        self.limits = limits
+
+    def _limit_for(self, path: str) -> Optional[int]:
+        for prefix, limit in self.limits.items():
+            if path.startswith(prefix):
+                return limit
+        return None
+
+    async def __call__(self, scope, receive, send):
+        file_max_size = self._limit_for(scope["path"]) if scope["type"] == "http" else None
+        if file_max_size is None:
+            await self.app(scope, receive, send)
+            return
+        max_size = file_max_size + MULTIPART_OVERHEAD
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    too_large = int(value) > max_size
+                except ValueError:
+                    too_large = False
+                if too_large:
+                    await self._reject(send, file_max_size)
+                    return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_size:
+                    raise UploadTooLargeError(file_max_size)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except UploadTooLargeError:
+            if response_started:
+                raise
+            await self._reject(send, file_max_size)
+
+    async def _reject(self, send, file_max_size: int) -> None:
+        detail = UploadTooLargeError(file_max_size).detail
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 400,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,173 @@
+# json_stream.py
+# app/services/shared/json_stream.py
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+_WHITESPACE = " \t\r\n"
+_TRAILING_COMMA = re.compile(r",(\s*[\]}])")
+
+
+class IncrementalJSONObjectParser:
+    """Emit the top-level members of a JSON object as soon as each is complete.
+
+    Text is fed in arbitrary chunks (for example streamed model tokens).
+    Anything before the first ``{`` is ignored, so a model that prefixes its
+    JSON with prose still parses. ``feed`` returns the ``(key, value)`` pairs
+    that were completed by the new text.
+
+    With ``lenient=True`` a member whose value is not valid JSON (after
+    dropping trailing commas) is skipped and recorded in ``skipped`` instead
+    of raising, so one bad field does not lose the rest of the object.
+    """
+
+    def __init__(self, lenient: bool = False):
+        self.lenient = lenient
+        self.skipped: List[str] = []
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._finished = False
+        # "key" -> expecting a key or "}", "colon", "value", "after" -> "," or "}"
+        self._state = "key"
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.result: dict = {}
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        self._buffer += text
+        completed: List[Tuple[str, Any]] = []
+        buffer = self._buffer
+        while self._pos < len(buffer) and not self._finished:
+            char = buffer[self._pos]
+
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                self._pos += 1
+                continue
+
+            if self._state == "key":
+                if char in _WHITESPACE or char == ",":
+                    self._pos += 1
+                elif char == "}":
+                    self._finished = True
+                    self._pos += 1
+                elif char == '"':
+                    end = self._string_end(buffer, self._pos)
+                    if end is None:
+                        break
+                    self._key = json.loads(buffer[self._pos:end + 1])
+                    self._pos = end + 1
+                    self._state = "colon"
+                else:
+                    raise ValueError(f"Unexpected character {char!r} where a key was expected")
+
+            elif self._state == "colon":
+                if char in _WHITESPACE:
+                    self._pos += 1
+                elif char == ":":
+                    self._pos += 1
+                    self._state = "value"
+                    self._value_start = None
+                else:
+                    raise ValueError(f"Unexpected character {char!r} where ':' was expected")
+
+            elif self._state == "value":
+                if self._value_start is None:
+                    if char in _WHITESPACE:
+                        self._pos += 1
+                        continue
+                    self._value_start = self._pos
+                    self._depth = 0
+                    self._in_string = False
+                    self._escaped = False
+
+                if self._in_string:
+                    if self._escaped:
+                        self._escaped = False
+                    elif char == "\\":
+                        self._escaped = True
+                    elif char == '"':
+                        self._in_string = False
+                        if self._depth == 0:
+                            self._complete_value(buffer, self._pos + 1, completed)
+                            continue
+                    self._pos += 1
+                elif char == '"':
+                    self._in_string = True
+                    self._pos += 1
+                elif char in "[{":
+                    self._depth += 1
+                    self._pos += 1
+                elif char in "]}":
+                    if self._depth == 0:
+                        # Closing brace of the outer object ends a bare scalar
+                        self._complete_value(buffer, self._pos, completed)
+                        continue
+                    self._depth -= 1
+                    self._pos += 1
+                    if self._depth == 0:
+                        self._complete_value(buffer, self._pos, completed)
+                elif char == "," and self._depth == 0:
+                    self._complete_value(buffer, self._pos, completed)
+                else:
+                    self._pos += 1
+
+            elif self._state == "after":
+                if char in _WHITESPACE:
+                    self._pos += 1
+                elif char == ",":
+                    self._pos += 1
+                    self._state = "key"
+                elif char == "}":
+                    self._pos += 1
+                    self._finished = True
+                else:
+                    raise ValueError(f"Unexpected character {char!r} after a value")
+
+        return completed
+
+    def _complete_value(self, buffer: str, end: int, completed: List[Tuple[str, Any]]) -> None:
+        raw = buffer[self._value_start:end].strip()
+        try:
+            value = self._decode(raw)
+        except json.JSONDecodeError:
+            if not self.lenient:
+                raise
+            self.skipped.append(self._key)
+        else:
+            self.result[self._key] = value
+            completed.append((self._key, value))
+        self._pos = end
+        self._state = "after"
+        self._value_start = None
+
+    def _decode(self, raw: str) -> Any:
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            if not self.lenient:
+                raise
+            return json.loads(_TRAILING_COMMA.sub(r"\1", raw))
+
+    @staticmethod
+    def _string_end(buffer: str, start: int) -> Optional[int]:
+        """Index of the closing quote of the string starting at ``start``"""
+        escaped = False
+        for index in range(start + 1, len(buffer)):
+            char = buffer[index]
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                return index
+        return None
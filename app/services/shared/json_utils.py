@@ -0,0 +1,39 @@
+# json_utils.py
+# app/services/shared/json_utils.py
+import json
+from typing import Any, Dict, Tuple
+
+from app.services.shared.json_stream import IncrementalJSONObjectParser
+
+
+def parse_partial_json_object(response: str) -> Tuple[Dict[str, Any], bool]:
+    """Recover the top-level members of the first JSON object in ``response``.
+
+    Prose and stray braces around the object are ignored, trailing commas
+    are tolerated and members whose values are malformed or cut off (for
+    example by ``max_tokens``) are dropped. Returns the members that parsed
+    and whether the object was closed. Raises ValueError if no member could
+    be recovered.
+    """
+    start = response.find("{")
+    while start != -1:
+        parser = IncrementalJSONObjectParser(lenient=True)
+        try:
+            parser.feed(response[start:])
+        except (json.JSONDecodeError, ValueError):
+            pass
+        if parser.result or parser.finished:
+            return parser.result, parser.finished and not parser.skipped
+        # Nothing usable from this brace (e.g. "{placeholder}" in prose); try the next
+        start = response.find("{", start + 1)
+    raise ValueError("No JSON object found in the response.")
+
+
+def extract_json_object(response: str) -> Dict[str, Any]:
+    """
+    Extracts a JSON object from a string, even if it's embedded in other text.
+    """
+    result, complete = parse_partial_json_object(response)
+    if not complete:
+        raise ValueError("The JSON object in the response is incomplete.")
+    return result
@@ -0,0 +1,313 @@
+# metrics.py
+# app/services/shared/metrics.py
+import contextvars
+import functools
+import inspect
+import math
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi.routing import APIRoute
+
+# Seconds; spans cache hits through multi-minute OCR and map-reduce runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], *extra: str) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    pairs.extend(label for label in extra if label)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self, constant: str = "") -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels, constant)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self, constant: str = "") -> Iterable[str]:
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, constant, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels, constant)} {_format_value(series[-1])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels, constant)} {cumulative}"
+
+
+class MetricsRegistry:
+    """Process-local metrics rendered in the Prometheus text exposition format.
+
+    Recording is a dict lookup and an add, cheap enough to leave on in
+    production. Metrics are only touched from the event loop thread. Each
+    worker process keeps its own registry; under a multi-worker server every
+    sample carries a ``worker`` label (see ``set_worker``) so scrapes that
+    land on different workers form separate series rather than one counter
+    jumping back and forth. Sum over ``worker`` for service-wide totals.
+    """
+
+    def __init__(self, namespace: str = "suepr"):
+        self.namespace = namespace
+        self._constant = ""
+        self._metrics: List[Any] = []
+        self._collectors: List[Tuple[str, Callable[[], Dict[str, Any]], Tuple[str, ...]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(f"{self.namespace}_{name}", documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(f"{self.namespace}_{name}", documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(f"{self.namespace}_{name}", documentation, labelnames, buckets))
+
+    def set_worker(self, worker: str) -> None:
+        """Label every sample from this process with its server worker slot"""
+        self._constant = _format_labels(("worker",), (worker,))[1:-1]
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_stats(self, name: str, source: Callable[[], Dict[str, Any]], counters: Sequence[str] = ()) -> None:
+        """Expose a component's ``stats()`` dict, read at scrape time.
+
+        Numeric fields become ``<namespace>_<name>_<field>`` gauges, or
+        counters with a ``_total`` suffix for fields listed in ``counters``.
+        One level of nested dicts is flattened into a ``kind`` label.
+        """
+        self._collectors.append((name, source, tuple(counters)))
+
+    def _collect_stats(self) -> Iterable[str]:
+        for name, source, counters in self._collectors:
+            try:
+                stats = source()
+            except Exception as e:
+                print(f"Error collecting {name} metrics: {str(e)}")
+                continue
+            series: Dict[str, List[Tuple[str, float]]] = {}
+            for key, value in stats.items():
+                if isinstance(value, dict):
+                    for field, nested in value.items():
+                        if isinstance(nested, (int, float)) and not isinstance(nested, bool):
+                            series.setdefault(field, []).append((_format_labels(("kind",), (key,), self._constant), nested))
+                elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                    series.setdefault(key, []).append((_format_labels((), (), self._constant), value))
+            for field, values in series.items():
+                is_counter = field in counters
+                metric = f"{self.namespace}_{name}_{field}" + ("_total" if is_counter else "")
+                yield f"# TYPE {metric} {'counter' if is_counter else 'gauge'}"
+                for labels, value in values:
+                    yield f"{metric}{labels} {_format_value(value)}"
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples(self._constant))
+        lines.extend(self._collect_stats())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+STAGE_SECONDS = metrics.histogram(
+    "stage_duration_seconds", "Time spent in each processing stage", ("service", "stage")
+)
+STAGE_IN_FLIGHT = metrics.gauge(
+    "stage_in_flight", "Processing stages currently running", ("service", "stage")
+)
+STAGE_ERRORS = metrics.counter(
+    "stage_errors_total", "Processing stages that raised", ("service", "stage")
+)
+HTTP_SECONDS = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency until the last body byte", ("method", "route", "status")
+)
+HTTP_PHASE_SECONDS = metrics.histogram(
+    "http_phase_duration_seconds",
+    "Request body parsing, endpoint and response serialization time",
+    ("route", "phase"),
+)
+HTTP_IN_FLIGHT = metrics.gauge("http_requests_in_flight", "HTTP requests currently being served")
+LLM_SECONDS = metrics.histogram(
+    "llm_request_duration_seconds", "Groq API call latency, per attempt", ("model", "outcome")
+)
+LLM_TOKENS = metrics.counter("llm_tokens_total", "Tokens reported by the Groq API", ("model", "kind"))
+LLM_PROFILE_SECONDS = metrics.histogram(
+    "llm_profile_duration_seconds",
+    "Routed LLM call latency per task profile and model, including fallbacks",
+    ("profile", "model", "outcome"),
+)
+
+# Starlette appends the charset
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+class stage:
+    """Time a block as ``service``/``name``; usable in sync and async code.
+
+    ``with stage("doc_upload", "extract"):`` records the duration, tracks
+    the in-flight count and counts exceptions.
+    """
+
+    __slots__ = ("labels", "started")
+
+    def __init__(self, service: str, name: str):
+        self.labels = (service, name)
+
+    def __enter__(self) -> "stage":
+        STAGE_IN_FLIGHT.inc(*self.labels)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, *self.labels)
+        STAGE_IN_FLIGHT.dec(*self.labels)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(*self.labels)
+
+
+# Per-request timestamps shared between the middleware and TimedRoute
+_request_timing: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_timing", default=None
+)
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that records when its endpoint starts and returns.
+
+    The metrics middleware turns these into parse (body, form and
+    dependencies), endpoint and serialization phases.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        if inspect.iscoroutinefunction(endpoint):
+            endpoint = self._timed(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    @staticmethod
+    def _timed(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(endpoint)
+        async def timed_endpoint(*args, **kwargs):
+            timing = _request_timing.get()
+            if timing is not None:
+                timing["endpoint_start"] = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                if timing is not None:
+                    timing["endpoint_end"] = time.perf_counter()
+        return timed_endpoint
+
+
+class MetricsMiddleware:
+    """Record request latency per route template and the phases TimedRoute marks"""
+
+    def __init__(self, app, exclude: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.exclude = tuple(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timing: Dict[str, float] = {}
+        token = _request_timing.set(timing)
+        status = "500"
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                timing["response_start"] = time.perf_counter()
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            _request_timing.reset(token)
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners cannot blow up cardinality
+            template = route.path_format if route is not None else "unmatched"
+            HTTP_SECONDS.observe(time.perf_counter() - started, scope["method"], template, status)
+            if "endpoint_start" in timing:
+                HTTP_PHASE_SECONDS.observe(timing["endpoint_start"] - started, template, "parse")
+                if "endpoint_end" in timing:
+                    HTTP_PHASE_SECONDS.observe(timing["endpoint_end"] - timing["endpoint_start"], template, "endpoint")
+                    if timing.get("response_start", 0) >= timing["endpoint_end"]:
+                        HTTP_PHASE_SECONDS.observe(timing["response_start"] - timing["endpoint_end"], template, "serialize")
@@ -0,0 +1,251 @@
+# model_router.py
+# app/services/shared/model_router.py
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.shared.groq_client import GroqClient
+from app.services.shared.metrics import LLM_PROFILE_SECONDS
+from app.services.shared.rate_limiter import parse_retry_after
+
+CLASSIFY = "classify"
+SUMMARIZE = "summarize"
+ANALYZE = "analyze"
+GENERATE = "generate"
+
+# Short structured answers go to the fastest model; case analysis and
+# letter drafting to the strongest. ``slo_seconds`` is how long the primary
+# model gets (to the first token, when streaming) before the fallback is tried.
+DEFAULT_PROFILES: Dict[str, Dict[str, Any]] = {
+    CLASSIFY: {
+        "model": "llama3-8b-8192",
+        "fallback_model": "gemma-7b-it",
+        "max_tokens": 300,
+        "temperature": 0.0,
+        "slo_seconds": 4.0,
+    },
+    SUMMARIZE: {
+        "model": "llama3-8b-8192",
+        "fallback_model": "mixtral-8x7b-32768",
+        "max_tokens": 1500,
+        "temperature": 0.3,
+        "slo_seconds": 10.0,
+    },
+    ANALYZE: {
+        "model": "llama3-70b-8192",
+        "fallback_model": "llama3-8b-8192",
+        "max_tokens": 2000,
+        "temperature": 0.3,
+        "slo_seconds": 20.0,
+    },
+    GENERATE: {
+        "model": "llama3-70b-8192",
+        "fallback_model": "llama3-8b-8192",
+        "max_tokens": 2000,
+        "temperature": 0.7,
+        "slo_seconds": 30.0,
+    },
+}
+
+OK = "ok"
+SLOW = "slow"
+RATE_LIMITED = "rate_limited"
+ERROR = "error"
+
+
+class TaskProfile:
+    def __init__(
+        self,
+        name: str,
+        model: str,
+        fallback_model: Optional[str],
+        max_tokens: int,
+        temperature: float,
+        slo_seconds: float,
+    ):
+        self.name = name
+        self.model = model
+        self.fallback_model = fallback_model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.slo_seconds = slo_seconds
+
+
+def _rate_limit_error(error: BaseException) -> Optional[BaseException]:
+    """The groq RateLimitError behind ``error``, if any"""
+    from groq import RateLimitError
+
+    while error is not None:
+        if isinstance(error, RateLimitError):
+            return error
+        error = error.__cause__ or error.__context__
+    return None
+
+
+class ModelRouter:
+    """Sends each LLM call to the model set by its task profile.
+
+    The primary model gets ``slo_seconds`` and no retries; if it is too
+    slow, rate-limited or failing, the call goes to the profile's fallback
+    model with the usual retries. A rate-limited primary is skipped for
+    its ``retry-after`` (or ``MODEL_ROUTER_COOLDOWN``) so later calls go
+    straight to the fallback. Latency and outcome are recorded per profile
+    and model for tuning the routing table.
+    """
+
+    def __init__(self):
+        self.groq_client = GroqClient()
+        self._cooldown_until: Dict[str, float] = {}
+        self.counts: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def profile(name: str) -> TaskProfile:
+        if name not in DEFAULT_PROFILES:
+            raise ValueError(f"Unknown task profile: {name}")
+        return TaskProfile(name, **{**DEFAULT_PROFILES[name], **settings.MODEL_ROUTES.get(name, {})})
+
+    def _candidates(self, profile: TaskProfile) -> List[str]:
+        if not profile.fallback_model or profile.fallback_model == profile.model:
+            return [profile.model]
+        if self._cooldown_until.get(profile.model, 0.0) > time.monotonic():
+            return [profile.fallback_model]
+        return [profile.model, profile.fallback_model]
+
+    def _record(self, profile: TaskProfile, model: str, outcome: str, started: float, began: float) -> None:
+        """Record one attempt; ``began`` is when the routed call started, for end-to-end latency"""
+        now = time.perf_counter()
+        LLM_PROFILE_SECONDS.observe(now - started, profile.name, model, outcome)
+        counts = self.counts.setdefault(
+            profile.name, {"calls": 0, "fallbacks": 0, SLOW: 0, RATE_LIMITED: 0, ERROR: 0, "seconds": 0.0}
+        )
+        if outcome == OK:
+            counts["calls"] += 1
+            counts["seconds"] += now - began
+            if model != profile.model:
+                counts["fallbacks"] += 1
+        else:
+            counts[outcome] += 1
+
+    def _failed(self, profile: TaskProfile, model: str, error: BaseException, started: float, began: float) -> None:
+        rate_limited = _rate_limit_error(error)
+        if rate_limited is not None:
+            response = getattr(rate_limited, "response", None)
+            retry_after = parse_retry_after(response.headers if response is not None else None)
+            self._cooldown_until[model] = time.monotonic() + (retry_after or settings.MODEL_ROUTER_COOLDOWN)
+        self._record(profile, model, RATE_LIMITED if rate_limited is not None else ERROR, started, began)
+
+    async def generate(
+        self,
+        task: str,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        cache_ttl: Optional[float] = None,
+        json_mode: bool = False,
+    ) -> str:
+        """Generate a response with the model chosen for ``task``; ``max_tokens`` overrides the profile's"""
+        profile = self.profile(task)
+        candidates = self._candidates(profile)
+        began = time.perf_counter()
+        for attempt, model in enumerate(candidates):
+            last = attempt == len(candidates) - 1
+            started = time.perf_counter()
+            call = self.groq_client.generate_response(
+                prompt=prompt,
+                system_prompt=system_prompt,
+                model=model,
+                max_tokens=max_tokens or profile.max_tokens,
+                temperature=profile.temperature,
+                cache_ttl=cache_ttl,
+                json_mode=json_mode,
+                max_retries=None if last else 0,
+            )
+            try:
+                response = await (call if last else asyncio.wait_for(call, profile.slo_seconds))
+            except asyncio.TimeoutError:
+                self._record(profile, model, SLOW, started, began)
+                continue
+            except Exception as e:
+                self._failed(profile, model, e, started, began)
+                if last:
+                    raise
+                continue
+            self._record(profile, model, OK, started, began)
+            return response
+
+    async def stream(
+        self,
+        task: str,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        cache_ttl: Optional[float] = None,
+        json_mode: bool = False,
+    ) -> AsyncIterator[str]:
+        """Stream a response with the model chosen for ``task``.
+
+        Falling back is only possible before the first token, so the SLO
+        applies to time to first token.
+        """
+        profile = self.profile(task)
+        candidates = self._candidates(profile)
+        began = time.perf_counter()
+        for attempt, model in enumerate(candidates):
+            last = attempt == len(candidates) - 1
+            started = time.perf_counter()
+            chunks = self.groq_client.stream_response(
+                prompt=prompt,
+                system_prompt=system_prompt,
+                model=model,
+                max_tokens=max_tokens or profile.max_tokens,
+                temperature=profile.temperature,
+                cache_ttl=cache_ttl,
+                json_mode=json_mode,
+            )
+            try:
+                first = chunks.__anext__()
+                first_chunk = await (first if last else asyncio.wait_for(first, profile.slo_seconds))
+            except StopAsyncIteration:
+                self._record(profile, model, OK, started, began)
+                return
+            except asyncio.TimeoutError:
+                await chunks.aclose()
+                self._record(profile, model, SLOW, started, began)
+                continue
+            except Exception as e:
+                await chunks.aclose()
+                self._failed(profile, model, e, started, began)
+                if last:
+                    raise
+                continue
+
+            try:
+                yield first_chunk
+                async for chunk in chunks:
+                    yield chunk
+            except Exception as e:
+                self._failed(profile, model, e, started, began)
+                raise
+            finally:
+                await chunks.aclose()
+            self._record(profile, model, OK, started, began)
+            return
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-profile call counts, fallbacks, failed attempts and mean end-to-end latency"""
+        stats = {}
+        for name, counts in self.counts.items():
+            profile = self.profile(name)
+            calls = counts["calls"]
+            stats[name] = {
+                "model": profile.model,
+                "fallback_model": profile.fallback_model,
+                "slo_seconds": profile.slo_seconds,
+                **{k: v for k, v in counts.items() if k != "seconds"},
+                "mean_seconds": round(counts["seconds"] / calls, 3) if calls else 0.0,
+            }
+        return stats
+
+
+model_router = ModelRouter()
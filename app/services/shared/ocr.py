@@ -0,0 +1,125 @@
+# ocr.py
+# app/services/shared/ocr.py
+import io
+from typing import List, Optional
+
+import pytesseract
+from PIL import Image, ImageOps, ImageSequence
+
+from app.core.config import settings
+
+# Long edge of a letter-size page, used to turn the target DPI into pixels
+PAGE_LONG_EDGE_INCHES = 11
+
+# One recognizer per worker process, created on first use and then reused so
+# the language model is loaded once rather than per image
+_tess_api = None
+_tess_api_failed = False
+
+
+def load_tesserocr():
+    """The tesserocr module, or None when it is not installed or cannot load here.
+
+    Imported on first use in the process doing OCR rather than at module
+    import: it installs signal handlers (via cysignals) as it loads, which
+    fails off the main thread and would replace the server's own handlers.
+    """
+    try:
+        import tesserocr
+    except ImportError:  # optional; pytesseract (one tesseract process per call) is used otherwise
+        return None
+    except ValueError as e:
+        print(f"Cannot load tesserocr in this thread: {str(e)}")
+        return None
+    return tesserocr
+
+
+def _get_tess_api():
+    global _tess_api, _tess_api_failed
+    if _tess_api is None and not _tess_api_failed and settings.OCR_PERSISTENT_ENGINE:
+        tesserocr = load_tesserocr()
+        try:
+            if tesserocr is not None:
+                _tess_api = tesserocr.PyTessBaseAPI(lang=settings.OCR_LANG)
+        except RuntimeError as e:
+            # Usually no traineddata where libtesseract looks (TESSDATA_PREFIX)
+            print(f"Persistent OCR engine unavailable, using pytesseract: {str(e)}")
+        _tess_api_failed = _tess_api is None
+    return _tess_api
+
+
+def _otsu_threshold(image: Image.Image) -> int:
+    """Pick the grayscale threshold that best separates ink from paper"""
+    histogram = image.histogram()
+    total = sum(histogram)
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    sum_background = 0
+    weight_background = 0
+    best_threshold = 127
+    best_variance = 0.0
+    for level in range(256):
+        weight_background += histogram[level]
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += level * histogram[level]
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_variance = variance
+            best_threshold = level
+    return best_threshold
+
+
+def normalize_image(image: Image.Image) -> Image.Image:
+    """Grayscale, downsample to the target DPI and optionally binarize"""
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("L")
+
+    max_dimension = settings.OCR_TARGET_DPI * PAGE_LONG_EDGE_INCHES
+    longest = max(image.size)
+    if longest > max_dimension:
+        scale = max_dimension / longest
+        image = image.resize(
+            (max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+            Image.LANCZOS,
+        )
+
+    if settings.OCR_BINARIZE:
+        threshold = _otsu_threshold(image)
+        image = image.point(lambda value: 255 if value > threshold else 0, mode="1")
+    return image
+
+
+def recognize(image: Image.Image) -> str:
+    """Run OCR on an already normalized image"""
+    api = _get_tess_api()
+    if api is not None:
+        api.SetImage(image)
+        return api.GetUTF8Text().strip()
+    return pytesseract.image_to_string(image, lang=settings.OCR_LANG).strip()
+
+
+def ocr_image(image: Image.Image) -> str:
+    """Normalize and OCR every frame of an image (multi-page TIFFs included)"""
+    pages: List[str] = []
+    for frame in ImageSequence.Iterator(image):
+        text = recognize(normalize_image(frame.copy()))
+        if text:
+            pages.append(text)
+    return "\n\n".join(pages)
+
+
+def ocr_image_bytes(file_content: bytes) -> str:
+    """Process-pool entry point: OCR an uploaded image"""
+    with Image.open(io.BytesIO(file_content)) as image:
+        return ocr_image(image)
+
+
+def warm_up() -> Optional[str]:
+    """Load the recognizer in the current worker process"""
+    api = _get_tess_api()
+    return "tesserocr" if api is not None else "pytesseract"
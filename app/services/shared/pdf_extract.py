@@ -0,0 +1,172 @@
+# pdf_extract.py
+# app/services/shared/pdf_extract.py
+import asyncio
+import io
+import math
+import time
+from typing import List, Optional, Tuple
+
+import PyPDF2
+from PIL import Image
+
+from app.core.config import settings
+from app.services.shared.executor import execution_engine, PROCESS, THREAD
+from app.services.shared.ocr import ocr_image
+
+try:
+    import pypdfium2
+except ImportError:  # optional renderer; embedded page images are used otherwise
+    pypdfium2 = None
+
+# Resolution used when rasterizing a page for OCR
+OCR_RENDER_DPI = 300
+
+
+def _count_pages(file_content: bytes) -> int:
+    return len(PyPDF2.PdfReader(io.BytesIO(file_content)).pages)
+
+
+def _open_renderer(file_content: bytes):
+    """Open the PDF for rasterizing, or None when pypdfium2 is not installed"""
+    if pypdfium2 is None:
+        return None
+    return pypdfium2.PdfDocument(file_content)
+
+
+def _render_page(pdf, page_index: int) -> Image.Image:
+    page = pdf[page_index]
+    try:
+        return page.render(scale=OCR_RENDER_DPI / 72).to_pil()
+    finally:
+        page.close()
+
+
+def _ocr_page(pdf, page: PyPDF2.PageObject, page_index: int) -> str:
+    """OCR a page that has no text layer, rendering it from ``pdf`` when available"""
+    if pdf is not None:
+        return ocr_image(_render_page(pdf, page_index))
+
+    # Scanned PDFs usually carry one full-page image per page
+    parts = []
+    for image_file in page.images:
+        try:
+            image = Image.open(io.BytesIO(image_file.data))
+        except Exception:
+            continue
+        parts.append(ocr_image(image))
+    return "\n".join(part for part in parts if part)
+
+
+def _extract_page_range(
+    file_content: bytes,
+    start: int,
+    end: int,
+    ocr_fallback: bool,
+    min_text_chars: int,
+    deadline: float,
+) -> Tuple[List[str], int]:
+    """Extract pages ``start:end``; returns page texts and how many were OCR'd.
+
+    Stops early once ``deadline`` (a ``time.time()`` value) has passed, so the
+    returned list may be shorter than the requested range.
+    """
+    reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+    pages = []
+    ocr_pages = 0
+    # Opened on the first page that needs OCR and shared by the rest of the range
+    renderer = None
+    try:
+        for index in range(start, end):
+            if time.time() > deadline:
+                break
+            page = reader.pages[index]
+            text = (page.extract_text() or "").strip()
+            if ocr_fallback and len(text) < min_text_chars:
+                try:
+                    if renderer is None:
+                        renderer = _open_renderer(file_content)
+                    ocr_text = _ocr_page(renderer, page, index)
+                except Exception:
+                    ocr_text = ""
+                if ocr_text:
+                    text = ocr_text
+                    ocr_pages += 1
+            pages.append(text)
+    finally:
+        if renderer is not None:
+            renderer.close()
+    return pages, ocr_pages
+
+
+async def extract_pdf_text(file_content: bytes) -> str:
+    """Extract text from a PDF, splitting its pages across the process pool.
+
+    Pages without a text layer are OCR'd when ``PDF_OCR_FALLBACK`` is set.
+    Extraction stops at ``PDF_MAX_PAGES`` pages or after ``PDF_TIME_BUDGET``
+    seconds; whatever was extracted by then is returned with a note saying
+    how many pages were covered.
+    """
+    total_pages = await execution_engine.run(THREAD, _count_pages, file_content)
+    page_limit = min(total_pages, settings.PDF_MAX_PAGES)
+    if page_limit == 0:
+        return ""
+
+    budget = settings.PDF_TIME_BUDGET
+    deadline = time.time() + budget
+
+    job_count = max(1, min(
+        settings.EXTRACTION_PROCESS_WORKERS,
+        math.ceil(page_limit / settings.PDF_MIN_PAGES_PER_JOB),
+    ))
+    pages_per_job = math.ceil(page_limit / job_count)
+    ranges = [
+        (start, min(start + pages_per_job, page_limit))
+        for start in range(0, page_limit, pages_per_job)
+    ]
+
+    jobs = [
+        asyncio.ensure_future(execution_engine.run(
+            PROCESS,
+            _extract_page_range,
+            file_content,
+            start,
+            end,
+            settings.PDF_OCR_FALLBACK,
+            settings.PDF_MIN_TEXT_CHARS,
+            deadline,
+            # Leave room for a page that was already in progress at the deadline
+            timeout=budget + settings.PDF_DEADLINE_GRACE,
+        ))
+        for start, end in ranges
+    ]
+    done, pending = await asyncio.wait(jobs, timeout=budget + settings.PDF_DEADLINE_GRACE)
+    for job in pending:
+        job.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    # Join ranges in page order, stopping at the first gap so the text
+    # is always a contiguous prefix of the document
+    pages: List[str] = []
+    first_error: Optional[BaseException] = None
+    for job, (start, end) in zip(jobs, ranges):
+        if job not in done:
+            break
+        if job.exception() is not None:
+            first_error = job.exception()
+            break
+        range_pages, _ = job.result()
+        pages.extend(range_pages)
+        if len(range_pages) < end - start:
+            break
+
+    if not pages and first_error is not None:
+        raise first_error
+
+    text = "\n".join(page for page in pages if page)
+    if not text.strip():
+        # No page text, e.g. the budget ran out before the first page was
+        # done; callers report an empty document, not a bare truncation note
+        return ""
+    if len(pages) < total_pages:
+        text += f"\n\n[Text extracted from the first {len(pages)} of {total_pages} pages]"
+    return text.strip()
@@ -0,0 +1,185 @@
+# rate_limiter.py
+# app/services/shared/rate_limiter.py
+import asyncio
+import contextvars
+import heapq
+import itertools
+import random
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings, Lazy
+
+# Lower values are scheduled first
+INTERACTIVE = 0
+DEFAULT = 5
+BACKGROUND = 9
+
+# Priority of LLM calls made from the current request or job
+llm_priority: contextvars.ContextVar[int] = contextvars.ContextVar("llm_priority", default=DEFAULT)
+
+
+@contextmanager
+def priority(value: int) -> Iterator[None]:
+    """Run the enclosed LLM calls at the given scheduling priority"""
+    token = llm_priority.set(value)
+    try:
+        yield
+    finally:
+        llm_priority.reset(token)
+
+
+class TokenBucket:
+    """Budget that refills continuously up to ``capacity`` per minute"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.available = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` can be taken (0 when it can be taken now)"""
+        self._refill()
+        # A single request larger than the whole budget waits for a full bucket
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.available -= min(amount, self.capacity)
+
+    def give_back(self, amount: float) -> None:
+        self._refill()
+        self.available = min(self.capacity, self.available + amount)
+
+
+class RateLimitScheduler:
+    """Queues outbound LLM calls so they stay within requests/tokens-per-minute.
+
+    Callers wait in priority order until both budgets can cover the call,
+    instead of being sent and rejected with a 429. A 429 from the API pauses
+    every caller until its ``retry-after`` has passed.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._waiters: List[Tuple[int, int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._paused_until = 0.0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self.throttled = 0
+        self.rate_limited = 0
+        self.retries = 0
+
+    async def acquire(self, estimated_tokens: int, priority_value: Optional[int] = None) -> None:
+        """Wait for budget to send one request of ``estimated_tokens``"""
+        if priority_value is None:
+            priority_value = llm_priority.get()
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority_value, next(self._sequence), estimated_tokens, future)
+        heapq.heappush(self._waiters, entry)
+        self._dispatch()
+        if not future.done():
+            self.throttled += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Budget was granted just as we were cancelled; return it
+                self.release(estimated_tokens, 0)
+            else:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._dispatch()
+            raise
+
+    def release(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Return the unused part of a token estimate once usage is known"""
+        if actual_tokens < estimated_tokens:
+            self.tokens.give_back(estimated_tokens - actual_tokens)
+            self._dispatch()
+
+    def pause(self, seconds: float) -> None:
+        """Hold every queued call for ``seconds`` (after a 429)"""
+        self.rate_limited += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Grant budget to waiters in priority order while it lasts"""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        while self._waiters:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            delay = max(
+                self._paused_until - time.monotonic(),
+                self.requests.wait_time(1),
+                self.tokens.wait_time(tokens),
+            )
+            if delay > 0:
+                # Strict priority: lower-priority calls never overtake the head
+                loop = asyncio.get_running_loop()
+                self._wakeup = loop.call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            future.set_result(None)
+
+    @staticmethod
+    def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+        """Delay before retry ``attempt`` (1-based): ``retry-after`` or jittered exponential"""
+        if retry_after is not None:
+            return retry_after + random.uniform(0, 0.25)
+        ceiling = min(settings.GROQ_RETRY_MAX_DELAY, settings.GROQ_RETRY_BASE_DELAY * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "waiting": len(self._waiters),
+            "requests_available": round(self.requests.available, 1),
+            "tokens_available": round(self.tokens.available),
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            "throttled": self.throttled,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+        }
+
+
+def parse_retry_after(headers: Any) -> Optional[float]:
+    """Seconds from a ``retry-after`` / ``retry-after-ms`` header, if present"""
+    if headers is None:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is not None:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+rate_limiter = Lazy(lambda: RateLimitScheduler(
+    settings.GROQ_REQUESTS_PER_MINUTE,
+    settings.GROQ_TOKENS_PER_MINUTE,
+))
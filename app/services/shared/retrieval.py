@@ -0,0 +1,186 @@
+# retrieval.py
+# app/services/shared/retrieval.py
+import math
+import re
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.config import settings, Lazy
+from app.services.shared.chunking import chunk_text, estimate_tokens
+
+# Standard BM25 parameters
+K1 = 1.5
+B = 0.75
+
+# Terms that mark the clauses a legal reader looks for first; used as the
+# query when there is no user question to rank passages against
+LEGAL_TERMS = (
+    "deadline due date days notice respond pay payment rent amount owed fee penalty "
+    "deposit court hearing summons judgment terminate termination breach default "
+    "evict eviction quit vacate damages liable obligation must shall"
+)
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be been but by for from had has have he her his i if in into is it its "
+    "me my no not of on or our she so than that the their them then there these they this to "
+    "was we were what when where which who will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word terms without stopwords, with plural endings folded"""
+    terms = []
+    for word in _WORD.findall(text.lower()):
+        if word in _STOPWORDS:
+            continue
+        if len(word) > 4 and word.endswith("ies"):
+            word = word[:-3] + "y"
+        elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+class Passage:
+    def __init__(self, document: int, position: int, source: str, text: str):
+        self.document = document
+        self.position = position
+        self.source = source
+        self.text = text
+        self.tokens = estimate_tokens(text)
+
+
+class PassageIndex:
+    """In-process BM25 index over the passages of a set of documents.
+
+    Documents are split into section-aware passages of about
+    ``RETRIEVAL_PASSAGE_TOKENS`` and added incrementally; postings are kept
+    per term, so adding a document costs only its own length.
+    """
+
+    def __init__(self, passage_tokens: Optional[int] = None):
+        self.passage_tokens = passage_tokens or settings.RETRIEVAL_PASSAGE_TOKENS
+        self.passages: List[Passage] = []
+        self.documents = 0
+        self._first_passage: List[int] = []
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._lengths: List[int] = []
+        self._total_length = 0
+
+    def add(self, source: str, text: str) -> int:
+        """Index a document; return its number"""
+        document = self.documents
+        self.documents += 1
+        self._first_passage.append(len(self.passages))
+        for position, chunk in enumerate(chunk_text(text, self.passage_tokens)):
+            passage_id = len(self.passages)
+            self.passages.append(Passage(document, position, source, chunk))
+            terms = Counter(tokenize(chunk))
+            for term, count in terms.items():
+                self._postings.setdefault(term, {})[passage_id] = count
+            length = sum(terms.values())
+            self._lengths.append(length)
+            self._total_length += length
+        return document
+
+    def search(self, query: str, documents: Optional[Iterable[int]] = None) -> List[Tuple[float, int]]:
+        """Return ``(score, passage_id)`` for passages matching ``query``, best first"""
+        if not self.passages:
+            return []
+        allowed = set(documents) if documents is not None else None
+        count = len(self.passages)
+        average_length = self._total_length / count or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for passage_id, frequency in postings.items():
+                if allowed is not None and self.passages[passage_id].document not in allowed:
+                    continue
+                norm = K1 * (1 - B + B * self._lengths[passage_id] / average_length)
+                scores[passage_id] = scores.get(passage_id, 0.0) + idf * frequency * (K1 + 1) / (frequency + norm)
+        return sorted(((score, pid) for pid, score in scores.items()), reverse=True)
+
+    def select(
+        self,
+        query: str,
+        max_tokens: int,
+        documents: Optional[Sequence[int]] = None,
+        leads: Sequence[int] = (),
+    ) -> List[Passage]:
+        """Pick the passages most relevant to ``query`` within ``max_tokens``.
+
+        The opening passage of each document in ``leads`` is taken first
+        (it usually names the parties and the subject). Results come back in
+        document order so the prompt reads like the source.
+        """
+        chosen: List[int] = []
+        used = 0
+
+        def take(passage_id: int) -> None:
+            nonlocal used
+            tokens = self.passages[passage_id].tokens + 1
+            if passage_id not in chosen and used + tokens <= max_tokens:
+                chosen.append(passage_id)
+                used += tokens
+
+        for document in leads:
+            first = self._first_passage[document]
+            if first < len(self.passages) and self.passages[first].document == document:
+                take(first)
+        for _, passage_id in self.search(query, documents):
+            take(passage_id)
+        chosen.sort(key=lambda i: (self.passages[i].document, self.passages[i].position))
+        return [self.passages[i] for i in chosen]
+
+
+def format_passages(passages: Sequence[Passage]) -> str:
+    return "\n\n".join(f"[{p.source}, part {p.position + 1}]\n{p.text}" for p in passages)
+
+
+def relevant_text(text: str, query: str, max_tokens: int, source: str = "document") -> str:
+    """``text`` if it fits in ``max_tokens``, else its passages most relevant to ``query``"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    index = PassageIndex()
+    index.add(source, text)
+    return format_passages(index.select(query, max_tokens, leads=(0,)))
+
+
+class CaseIndexes:
+    """LRU of per-case passage indexes, extended as documents are added"""
+
+    def __init__(self, max_items: Optional[int] = None):
+        self.max_items = max_items if max_items is not None else settings.RETRIEVAL_INDEX_ITEMS
+        self._indexes: "OrderedDict[str, PassageIndex]" = OrderedDict()
+        self._fingerprints: Dict[str, List[Tuple[str, int]]] = {}
+
+    def get(self, case_id: str, documents: Sequence[Tuple[str, str]]) -> PassageIndex:
+        """Return the index for ``case_id`` covering ``documents`` (in the order the case stores them)"""
+        index = self._indexes.get(case_id)
+        # Cases only ever gain documents; anything else means the case was
+        # removed and started again, so the index is rebuilt
+        fingerprint = [(source, len(text)) for source, text in documents]
+        if index is None or self._fingerprints[case_id] != fingerprint[:index.documents]:
+            index = PassageIndex()
+        for source, text in documents[index.documents:]:
+            index.add(source, text)
+        self._fingerprints[case_id] = fingerprint
+        self._indexes[case_id] = index
+        self._indexes.move_to_end(case_id)
+        while len(self._indexes) > self.max_items:
+            evicted, _ = self._indexes.popitem(last=False)
+            del self._fingerprints[evicted]
+        return index
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "indexes": len(self._indexes),
+            "passages": sum(len(index.passages) for index in self._indexes.values()),
+        }
+
+
+case_indexes = Lazy(CaseIndexes)
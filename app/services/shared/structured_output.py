@@ -0,0 +1,231 @@
+# structured_output.py
+# app/services/shared/structured_output.py
+import json
+import re
+import typing
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from app.core.config import settings
+from app.services.shared.json_utils import parse_partial_json_object
+from app.services.shared.model_router import model_router, ANALYZE
+
+CLEAN = "clean"
+REPAIRED = "repaired"
+REREQUESTED = "rerequested"
+FAILED = "failed"
+
+REPAIR_SYSTEM_PROMPT = """You are completing a JSON object that another response left unfinished.
+        You are given the original instructions, the request, and the fields that
+        were already produced. Respond with a JSON object containing ONLY the
+        missing fields listed, following the original instructions for each."""
+
+_INTEGER = re.compile(r"-?\d+")
+_adapters: Dict[Any, TypeAdapter] = {}
+
+
+def _adapter(annotation: Any) -> TypeAdapter:
+    adapter = _adapters.get(annotation)
+    if adapter is None:
+        adapter = _adapters[annotation] = TypeAdapter(annotation)
+    return adapter
+
+
+def _as_text(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return " - ".join(_as_text(v) for v in value.values() if v is not None)
+    if isinstance(value, list):
+        return "\n".join(_as_text(v) for v in value)
+    return str(value)
+
+
+def _coerce(annotation: Any, value: Any) -> Any:
+    """Validate ``value`` against ``annotation``, fixing common model slips.
+
+    Handles numbers sent as text ("85", "85/100"), scalars where a list is
+    expected, lists or objects where text is expected, and drops list items
+    that cannot be fixed. Raises ValidationError if the value is unusable.
+    """
+    adapter = _adapter(annotation)
+    try:
+        return adapter.validate_python(value)
+    except ValidationError:
+        pass
+
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Union and type(None) in args:
+        inner = [arg for arg in args if arg is not type(None)]
+        if value is None:
+            return None
+        return _coerce(inner[0], value)
+    if origin in (list, List):
+        item_type = args[0] if args else Any
+        items = value if isinstance(value, list) else [value]
+        fixed = []
+        for item in items:
+            try:
+                fixed.append(_coerce(item_type, item))
+            except ValidationError:
+                continue
+        return adapter.validate_python(fixed)
+    if annotation is int:
+        if isinstance(value, float):
+            return round(value)
+        match = _INTEGER.search(_as_text(value))
+        return adapter.validate_python(int(match.group(0)) if match else value)
+    if annotation is str and value is not None:
+        return _as_text(value)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel) and isinstance(value, dict):
+        known = {name: value[name] for name in annotation.model_fields if name in value}
+        return annotation.model_validate(known)
+    return adapter.validate_python(value)
+
+
+class StructuredOutputStats:
+    """Outcome counts per schema, for /health and the failure/repair rates"""
+
+    def __init__(self):
+        self.counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, schema: str, outcome: str) -> None:
+        counts = self.counts.setdefault(schema, {CLEAN: 0, REPAIRED: 0, REREQUESTED: 0, FAILED: 0})
+        counts[outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        totals = {CLEAN: 0, REPAIRED: 0, REREQUESTED: 0, FAILED: 0}
+        for counts in self.counts.values():
+            for outcome, count in counts.items():
+                totals[outcome] += count
+        responses = sum(totals.values())
+        return {
+            **totals,
+            "responses": responses,
+            "repair_rate": round((totals[REPAIRED] + totals[REREQUESTED]) / responses, 4) if responses else 0.0,
+            "failure_rate": round(totals[FAILED] / responses, 4) if responses else 0.0,
+            "schemas": self.counts,
+        }
+
+
+structured_output_stats = StructuredOutputStats()
+
+
+class StructuredOutput:
+    """Turns model text into fields of a Pydantic model, repairing what it can.
+
+    Parsing is tolerant (see ``parse_partial_json_object``) and each field is
+    validated on its own, so a truncated or partly malformed response still
+    yields every field that came through intact. Missing required fields are
+    then asked for in one short follow-up call instead of repeating the whole
+    request.
+
+    ``fields`` limits the schema to the members the model is asked to produce
+    (for example ``CaseInterpretOutput`` minus ``extracted_text``);
+    ``required`` defaults to those without a default value. Follow-up calls
+    are routed with the ``task`` profile of the original call.
+    """
+
+    def __init__(
+        self,
+        model: Type[BaseModel],
+        fields: Optional[Sequence[str]] = None,
+        required: Optional[Sequence[str]] = None,
+        name: Optional[str] = None,
+        task: str = ANALYZE,
+    ):
+        self.model = model
+        self.task = task
+        self.name = name or model.__name__
+        model_fields = model.model_fields
+        self.fields = list(fields) if fields is not None else list(model_fields)
+        if required is None:
+            required = [field for field in self.fields if model_fields[field].is_required()]
+        self.required = list(required)
+
+    def _missing(self, values: Dict[str, Any]) -> List[str]:
+        return [field for field in self.required if values.get(field) in (None, "")]
+
+    def parse(self, response: str) -> Tuple[Dict[str, Any], List[str], bool]:
+        """Return the valid fields, the required fields still missing, and whether anything was repaired"""
+        try:
+            raw, complete = parse_partial_json_object(response)
+        except ValueError:
+            return {}, list(self.required), True
+
+        values: Dict[str, Any] = {}
+        repaired = not complete
+        for field in self.fields:
+            if field not in raw:
+                continue
+            annotation = self.model.model_fields[field].annotation
+            try:
+                values[field] = _adapter(annotation).validate_python(raw[field])
+                continue
+            except ValidationError:
+                repaired = True
+            try:
+                values[field] = _coerce(annotation, raw[field])
+            except (ValidationError, ValueError, TypeError):
+                continue
+        missing = self._missing(values)
+        return values, missing, repaired or bool(missing)
+
+    async def complete(
+        self,
+        response: str,
+        prompt: str,
+        system_prompt: str,
+        cache_ttl: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Parse ``response`` and re-request any missing required fields.
+
+        Returns the field values. Raises ValueError if required fields are
+        still missing after the configured repair attempts.
+        """
+        values, missing, repaired = self.parse(response)
+        outcome = REPAIRED if repaired else CLEAN
+        attempts = 0
+        while missing and attempts < settings.STRUCTURED_OUTPUT_REPAIR_ATTEMPTS:
+            attempts += 1
+            outcome = REREQUESTED
+            follow_up = await model_router.generate(
+                self.task,
+                prompt=self._repair_prompt(values, missing, prompt, system_prompt),
+                system_prompt=REPAIR_SYSTEM_PROMPT,
+                max_tokens=settings.STRUCTURED_OUTPUT_REPAIR_MAX_TOKENS,
+                cache_ttl=cache_ttl,
+                json_mode=True,
+            )
+            recovered, _, _ = self.parse(follow_up)
+            values.update({field: recovered[field] for field in missing if field in recovered})
+            missing = self._missing(values)
+
+        if missing:
+            structured_output_stats.record(self.name, FAILED)
+            raise ValueError(f"Response is missing required fields: {', '.join(missing)}")
+        structured_output_stats.record(self.name, outcome)
+        return values
+
+    def _repair_prompt(self, values: Dict[str, Any], missing: List[str], prompt: str, system_prompt: str) -> str:
+        properties = self.model.model_json_schema().get("properties", {})
+        wanted = {field: properties.get(field, {}).get("type", "any") for field in missing}
+        return f"""
+        Original instructions:
+        {system_prompt}
+
+        Original request:
+        {prompt}
+
+        Fields already produced:
+        {json.dumps(values, default=str)}
+
+        Missing fields (name: JSON type): {json.dumps(wanted)}
+        Respond with a JSON object containing only the missing fields.
+        """
+
+    def build(self, values: Dict[str, Any], **extra: Any) -> BaseModel:
+        """Build the model from parsed values plus fields supplied by the caller"""
+        return self.model(**{**values, **extra})
@@ -5,12 +5,38 @@ import aiofiles
 from typing import Optional
 import uuid
 from datetime import datetime
-import PyPDF2
-import pytesseract
-from PIL import Image
-from docx import Document
 import io
 
+from app.core.config import settings
+from app.services.shared.executor import execution_engine, PROCESS, THREAD
+from app.services.shared.metrics import stage
+
+# Bump whenever extractor output changes so cached text is not reused
+EXTRACTOR_VERSION = "4"
+
+
+# Blocking extractors. These live at module level so they can be pickled
+# and run inside the extraction process pool. They read straight from the
+# upload bytes; nothing is written to disk. Parser libraries are imported on
+# first use (see warm_up) so importing the app stays fast.
+
+def _extract_docx_text(file_content: bytes) -> str:
+    from docx import Document
+
+    doc = Document(io.BytesIO(file_content))
+    text = ""
+    for paragraph in doc.paragraphs:
+        text += paragraph.text + "\n"
+    return text.strip()
+
+
+def warm_up() -> None:
+    """Import the extractor libraries in this process ahead of the first upload"""
+    import docx  # noqa: F401
+    import PyPDF2  # noqa: F401
+    from app.services.shared import ocr, pdf_extract  # noqa: F401
+
+
 class FileUtils:
     @staticmethod
     def generate_unique_filename(original_filename: str) -> str:
@@ -23,48 +49,47 @@ class FileUtils:
     @staticmethod
     async def save_upload_file(file_content: bytes, filename: str) -> str:
         """Save uploaded file to temp directory"""
-        file_path = os.path.join("uploads/temp", filename)
+        file_path = os.path.join(settings.UPLOAD_TEMP_DIR, filename)
         
-        async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(file_content)
+        with stage("files", "save_upload"):
+            async with aiofiles.open(file_path, 'wb') as f:
+                await f.write(file_content)
         
         return file_path
     
     @staticmethod
-    async def extract_text_from_pdf(file_path: str) -> str:
-        """Extract text from PDF file"""
+    async def extract_text_from_pdf(file_content: bytes) -> str:
+        """Extract text from PDF file, OCR'ing pages that have no text layer"""
+        from app.services.shared.pdf_extract import extract_pdf_text
+
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                return text.strip()
+            return await extract_pdf_text(file_content)
         except Exception as e:
             raise Exception(f"Error extracting text from PDF: {str(e)}")
     
     @staticmethod
-    async def extract_text_from_docx(file_path: str) -> str:
+    async def extract_text_from_docx(file_content: bytes) -> str:
         """Extract text from DOCX file"""
         try:
-            doc = Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text.strip()
+            return await execution_engine.run(THREAD, _extract_docx_text, file_content)
         except Exception as e:
             raise Exception(f"Error extracting text from DOCX: {str(e)}")
     
     @staticmethod
-    async def extract_text_from_image(file_path: str) -> str:
+    async def extract_text_from_image(file_content: bytes) -> str:
         """Extract text from image using OCR"""
+        from app.services.shared.ocr import ocr_image_bytes
+
         try:
-            image = Image.open(file_path)
-            text = pytesseract.image_to_string(image)
-            return text.strip()
+            return await execution_engine.run(PROCESS, ocr_image_bytes, file_content)
         except Exception as e:
             raise Exception(f"Error extracting text from image: {str(e)}")
     
+    @staticmethod
+    async def extract_text_from_txt(file_content: bytes) -> str:
+        """Decode a plain text file"""
+        return file_content.decode('utf-8', errors='replace')
+    
     @staticmethod
     async def cleanup_file(file_path: str) -> None:
         """Delete temporary file"""
@@ -0,0 +1,131 @@
+# warmup.py
+# app/services/shared/warmup.py
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.shared.executor import execution_engine, PROCESS, THREAD
+
+LLM = "llm"
+EXTRACTORS = "extractors"
+OCR = "ocr"
+DOCX = "docx"
+
+
+async def _warm_llm() -> None:
+    from app.services.shared.groq_client import GroqClient
+
+    await GroqClient.startup()
+    await GroqClient.connect()
+
+
+async def _warm_extractors() -> None:
+    from app.services.shared import utils
+
+    await execution_engine.warm_up(PROCESS, utils.warm_up)
+    # Thread-pool extractors share this process's imports
+    await asyncio.to_thread(utils.warm_up)
+
+
+async def _warm_ocr() -> None:
+    from app.services.shared import ocr
+
+    await execution_engine.warm_up(PROCESS, ocr.warm_up)
+
+
+async def _warm_docx() -> None:
+    from app.services.doc_generate.docx_renderer import docx_renderer
+
+    await execution_engine.run(THREAD, docx_renderer.warm_up)
+
+
+# In run order
+WARMUP_TASKS: Dict[str, Callable[[], Awaitable[None]]] = {
+    OCR: _warm_ocr,
+    EXTRACTORS: _warm_extractors,
+    DOCX: _warm_docx,
+    LLM: _warm_llm,
+}
+
+
+def _preload_extractors() -> None:
+    from app.services.shared import utils
+
+    utils.warm_up()
+
+
+def _preload_docx() -> None:
+    from app.services.doc_generate.docx_renderer import docx_renderer
+
+    docx_renderer.warm_up()
+
+
+# Pure-Python imports and builds that are safe before fork(); no pools,
+# engines or connections
+PRELOAD_TASKS: Dict[str, Callable[[], None]] = {
+    EXTRACTORS: _preload_extractors,
+    OCR: _preload_extractors,
+    DOCX: _preload_docx,
+}
+
+
+class WarmUp:
+    """Startup phase that loads lazily imported code before traffic arrives.
+
+    Which tasks run is set per deployment by ``WARMUP_TASKS``. Tasks run one
+    at a time in a fixed order; a failing or slow task is logged and
+    recorded, and each is cut off after ``WARMUP_TIMEOUT``.
+    """
+
+    def __init__(self):
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def configured_tasks() -> List[str]:
+        names = [name.strip() for name in settings.WARMUP_TASKS.split(",") if name.strip()]
+        unknown = [name for name in names if name not in WARMUP_TASKS]
+        if unknown:
+            raise ValueError(f"Unknown warm-up tasks: {', '.join(unknown)}")
+        return names
+
+    async def _run_task(self, name: str, timeout: float) -> None:
+        started = time.perf_counter()
+        error: Optional[str] = None
+        try:
+            await asyncio.wait_for(WARMUP_TASKS[name](), timeout)
+        except asyncio.TimeoutError:
+            error = f"timed out after {timeout} seconds"
+        except Exception as e:
+            error = str(e)
+        if error is not None:
+            print(f"Warm-up task {name} failed: {error}")
+        self.results[name] = {
+            "seconds": round(time.perf_counter() - started, 3),
+            "ok": error is None,
+            "error": error,
+        }
+
+    async def run(self, names: Optional[List[str]] = None) -> None:
+        """Run the configured warm-up tasks"""
+        if names is None:
+            names = self.configured_tasks()
+        for name in WARMUP_TASKS:
+            if name in names:
+                await self._run_task(name, settings.WARMUP_TIMEOUT)
+
+    def preload(self) -> None:
+        """Do the fork-safe part of the configured tasks in a pre-forking
+        server's master, so workers share those pages copy-on-write"""
+        done = set()
+        for name in self.configured_tasks():
+            task = PRELOAD_TASKS.get(name)
+            if task is not None and task not in done:
+                task()
+                done.add(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.results
+
+
+warm_up = WarmUp()
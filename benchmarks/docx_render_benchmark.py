@@ -0,0 +1,126 @@
+# benchmarks/docx_render_benchmark.py
+"""Bulk DOCX generation: per-document render time, old path vs. DocxRenderer.
+
+Usage:
+    python -m benchmarks.docx_render_benchmark [--count N] [--paragraphs P] [--json OUT]
+
+The baseline reproduces the original ``_create_word_document``: a fresh
+``Document()`` per letter saved to disk. The engine path deep-copies a cached
+base document and renders to bytes in memory.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from docx import Document
+
+from app.models.ai_models import UserDetails
+from app.services.doc_generate.doc_generate_service import DOCUMENT_TEMPLATES
+from app.services.doc_generate.docx_renderer import DocxRenderer
+
+USER = UserDetails(
+    name="Jane Doe",
+    address="123 Lakeview Rd, Sacramento, CA",
+    opposing_party="Acme Property Management",
+    facts="Security deposit of $1,850 not returned within 21 days.",
+)
+
+
+def _content(paragraphs: int) -> str:
+    sentence = (
+        "Pursuant to California Civil Code Section 1950.5, you were required to "
+        "return the security deposit or provide an itemized statement within 21 days. "
+    )
+    return "\n\n".join(sentence * 4 for _ in range(paragraphs))
+
+
+def _baseline(directory: str) -> Callable[[str, str], None]:
+    def render(content: str, title: str) -> None:
+        doc = Document()
+        title_para = doc.add_heading(title, 0)
+        title_para.alignment = 1
+        date_para = doc.add_paragraph(f"Date: {datetime.now().strftime('%B %d, %Y')}")
+        date_para.alignment = 2
+        doc.add_paragraph()
+        sender_para = doc.add_paragraph("From:")
+        sender_para.add_run(f"\n{USER.name}")
+        sender_para.add_run(f"\n{USER.address}")
+        doc.add_paragraph()
+        recipient_para = doc.add_paragraph("To:")
+        recipient_para.add_run(f"\n{USER.opposing_party}")
+        doc.add_paragraph()
+        doc.add_paragraph(content)
+        doc.add_paragraph()
+        doc.add_paragraph("Sincerely,")
+        doc.add_paragraph()
+        doc.add_paragraph("_" * 30)
+        doc.add_paragraph(USER.name)
+        filename = f"{title.replace(' ', '_')}_{uuid.uuid4().hex[:8]}.docx"
+        doc.save(os.path.join(directory, filename))
+    return render
+
+
+def _engine(renderer: DocxRenderer, document_type: str) -> Callable[[str, str], None]:
+    def render(content: str, title: str) -> None:
+        renderer.render(content, title, USER, document_type)
+    return render
+
+
+def _run(render: Callable[[str, str], None], count: int, content: str, title: str) -> Dict[str, float]:
+    timings: List[float] = []
+    for _ in range(count):
+        start = time.perf_counter()
+        render(content, title)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "mean_ms": round(statistics.mean(timings) * 1000, 3),
+        "p50_ms": round(timings[len(timings) // 2] * 1000, 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1] * 1000, 3),
+        "total_s": round(sum(timings), 3),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=8)
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    document_type = "Demand Letter"
+    title = f"{document_type} - {USER.name}"
+    content = _content(args.paragraphs)
+
+    renderer = DocxRenderer()
+    renderer.register_types(DOCUMENT_TEMPLATES)
+    renderer.warm_up()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = {
+            "baseline": _run(_baseline(directory), args.count, content, title),
+            "engine": _run(_engine(renderer, document_type), args.count, content, title),
+        }
+
+    print(f"{args.count} documents, {args.paragraphs} paragraphs each")
+    print(f"{'path':<10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'total s':>10}")
+    for label, stats in results.items():
+        print(f"{label:<10}{stats['mean_ms']:>10}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['total_s']:>10}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"count": args.count, "paragraphs": args.paragraphs, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
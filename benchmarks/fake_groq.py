@@ -0,0 +1,215 @@
+# benchmarks/fake_groq.py
+"""Local stand-in for the Groq chat completions API.
+
+Usage:
+    python -m benchmarks.fake_groq [--port 8100] [--latency 0.2] [--jitter 0.05]
+        [--tokens-per-second 800] [--error-rate 0.0] [--responses FILE]
+
+Point the app at it with ``GROQ_BASE_URL=http://127.0.0.1:<port>``. Each
+request waits ``latency`` (plus up to ``jitter``) seconds, then streams or
+returns its completion at ``tokens-per-second``. With ``--error-rate`` that
+fraction of requests fails with a 429 (with Retry-After) or a 500. Replies
+are canned by prompt: document analysis, chunk analysis and case analysis
+get valid JSON, anything else a short letter. ``--responses`` takes a JSON
+object mapping a system-prompt substring to reply text, checked first.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+DOCUMENT_ANALYSIS = {
+    "document_type": "notice",
+    "legal_summary": "Notice to pay rent or quit served on the tenant; rent of $1,850 is overdue.",
+    "actions": ["Pay the overdue rent or respond in writing", "Keep proof of payment"],
+    "deadlines": ["Pay or vacate within three days of service"],
+    "confidence_score": 82,
+}
+
+CHUNK_ANALYSIS = {
+    "document_type": "lease",
+    "summary": "This part sets out rent, the due date and late fees.",
+    "actions": ["Check the late fee amount"],
+    "deadlines": ["Rent due on the 1st of each month"],
+}
+
+CASE_ANALYSIS = {
+    "summary": "Tenant seeks return of a withheld security deposit.",
+    "score": 72,
+    "strengths": ["Move-out photos", "Written lease"],
+    "weaknesses": ["No forwarding address on file"],
+    "followup_questions": ["When did you move out?"],
+    "recommended_court": "Small claims court",
+    "gameplan": ["Send a demand letter", "File in small claims if unpaid"],
+    "timeline": [{"step": "Send demand letter", "due_date": "2025-01-15"}],
+    "chat_response": None,
+}
+
+LETTER = (
+    "Dear Sir or Madam,\n\nThis letter concerns the security deposit of $1,500 that "
+    "remains unpaid. Please return it within fourteen days of this letter, or I will "
+    "pursue the matter in small claims court.\n"
+)
+
+
+class FakeGroq:
+    def __init__(
+        self,
+        latency: float,
+        jitter: float,
+        tokens_per_second: float,
+        error_rate: float,
+        responses: Optional[Dict[str, str]] = None,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.responses = responses or {}
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+
+    def _reply(self, messages: List[Dict[str, str]]) -> str:
+        system = next((m["content"] for m in messages if m["role"] == "system"), "")
+        for marker, reply in self.responses.items():
+            if marker in system:
+                return reply
+        if "one part of a longer" in system:
+            return json.dumps(CHUNK_ANALYSIS)
+        if "document_type" in system:
+            return json.dumps(DOCUMENT_ANALYSIS)
+        if "JSON" in system:
+            return json.dumps(CASE_ANALYSIS)
+        return LETTER
+
+    @staticmethod
+    def _tokens(text: str) -> int:
+        return max(1, len(text) // 4)
+
+    def _generation_time(self, completion_tokens: int) -> float:
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return completion_tokens / self.tokens_per_second
+
+    async def chat_completions(self, request: Request):
+        self.requests += 1
+        body = await request.json()
+        await asyncio.sleep(self.latency + self.random.uniform(0, self.jitter))
+
+        if self.random.random() < self.error_rate:
+            self.errors += 1
+            if self.random.random() < 0.5:
+                return JSONResponse(
+                    {"error": {"message": "Rate limit reached", "type": "tokens"}},
+                    status_code=429,
+                    headers={"retry-after": "1"},
+                )
+            return JSONResponse({"error": {"message": "Internal server error"}}, status_code=500)
+
+        model = body.get("model", "llama3-8b-8192")
+        content = self._reply(body.get("messages", []))
+        prompt_tokens = sum(self._tokens(m.get("content", "")) for m in body.get("messages", []))
+        completion_tokens = self._tokens(content)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if body.get("stream"):
+            return StreamingResponse(
+                self._stream(completion_id, created, model, content, usage),
+                media_type="text/event-stream",
+            )
+
+        await asyncio.sleep(self._generation_time(completion_tokens))
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }],
+            "usage": usage,
+        })
+
+    async def _stream(self, completion_id: str, created: int, model: str, content: str, usage: Dict[str, int]):
+        # Roughly four characters per token, sent a few tokens at a time
+        piece = 16
+        delay = self._generation_time(self._tokens(content[:piece]))
+        for start in range(0, len(content), piece):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": content[start:start + piece]}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(delay)
+        final = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    async def models(self, request: Request):
+        return JSONResponse({"object": "list", "data": [{"id": "llama3-8b-8192", "object": "model"}]})
+
+    async def stats(self, request: Request):
+        return JSONResponse({"requests": self.requests, "errors": self.errors})
+
+    def app(self) -> Starlette:
+        return Starlette(routes=[
+            Route("/openai/v1/chat/completions", self.chat_completions, methods=["POST"]),
+            Route("/openai/v1/models", self.models),
+            Route("/stats", self.stats),
+        ])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.05, help="extra random latency, seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=800.0, help="0 returns completions instantly")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--responses", help="JSON file mapping system-prompt substrings to replies")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    responses = None
+    if args.responses:
+        with open(args.responses, encoding="utf-8") as f:
+            responses = json.load(f)
+
+    fake = FakeGroq(args.latency, args.jitter, args.tokens_per_second, args.error_rate, responses, args.seed)
+    uvicorn.run(fake.app(), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# benchmarks/import_time_benchmark.py
+"""Check that importing the app stays fast and keeps heavy libraries deferred.
+
+Usage:
+    python -m benchmarks.import_time_benchmark [--runs 5] [--budget-ms 1000] [--top 10] [--json OUT]
+
+Imports ``main`` in fresh interpreters under ``-X importtime`` and reports
+the median cumulative import time and the slowest modules. Exits 1 if the
+median exceeds ``--budget-ms`` or if any library that should load lazily
+(the groq SDK and httpx, PyPDF2, PIL, pytesseract, python-docx) is imported by
+``import main``, or if importing it builds ``Settings`` (settings are read at
+startup, so the app imports without GROQ_API_KEY set). CI runs it on every
+push and pull request (.github/workflows/import-time.yml).
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use or by the lifespan warm-up, never by ``import main``
+DEFERRED_MODULES = ("groq", "httpx", "PyPDF2", "PIL", "pytesseract", "docx", "tesserocr", "pypdfium2")
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)$")
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("GROQ_API_KEY", "benchmark")
+    return env
+
+
+def _import_once() -> Tuple[float, Dict[str, int]]:
+    """Import main in a fresh interpreter; return its ms and per-module cumulative µs"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=REPO_ROOT,
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules: Dict[str, int] = {}
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            modules[match.group(3)] = int(match.group(2))
+    return modules["main"] / 1000, modules
+
+
+def _import_side_effects() -> Tuple[List[str], bool]:
+    """Deferred modules loaded by ``import main``, and whether it built Settings"""
+    code = (
+        "import json, sys, main; "
+        "from app.core.config import get_settings; "
+        f"print(json.dumps([sorted(m for m in {DEFERRED_MODULES!r} if m in sys.modules), "
+        "get_settings.cache_info().currsize > 0]))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPO_ROOT,
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    deferred, settings_built = json.loads(completed.stdout.strip().splitlines()[-1])
+    return deferred, settings_built
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1000.0, help="maximum median import time")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    totals = []
+    modules: Dict[str, int] = {}
+    for _ in range(args.runs):
+        total_ms, modules = _import_once()
+        totals.append(total_ms)
+    median_ms = statistics.median(totals)
+    deferred, settings_built = _import_side_effects()
+
+    print(f"import main: median {median_ms:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    print(f"{'module':<48}{'cumulative ms':>14}")
+    app_modules = sorted(
+        ((name, us) for name, us in modules.items() if name.startswith("app.") or name == "main"),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    for name, us in app_modules[:args.top]:
+        print(f"{name:<48}{us / 1000:>14.1f}")
+
+    ok = True
+    if median_ms > args.budget_ms:
+        print(f"FAIL: import time {median_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+        ok = False
+    if deferred:
+        print(f"FAIL: imported eagerly by main: {', '.join(deferred)}")
+        ok = False
+    if settings_built:
+        print("FAIL: import main built Settings; read settings at startup or on first use")
+        ok = False
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "median_ms": round(median_ms, 1),
+                "runs_ms": [round(t, 1) for t in totals],
+                "budget_ms": args.budget_ms,
+                "eager_deferred_modules": deferred,
+                "settings_built_by_import": settings_built,
+                "modules_ms": {name: round(us / 1000, 1) for name, us in app_modules},
+            }, f, indent=2)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+# benchmarks/load_benchmark.py
+"""Throughput and latency scenarios against a local server and fake Groq API.
+
+Usage:
+    python -m benchmarks.load_benchmark [--scenarios case,upload_txt,...]
+        [--concurrency 1,4,16] [--requests 40] [--warm]
+        [--fake-latency 0.2] [--fake-tokens-per-second 800] [--fake-error-rate 0]
+        [--json OUT] [--compare BASELINE.json] [--max-regression 0.2]
+
+Starts ``benchmarks.fake_groq`` and ``uvicorn main:app`` as subprocesses on
+free local ports, with caches, job and document stores in a temporary
+directory, so it runs without network access. Every scenario is driven at
+each concurrency level and reports requests/sec and p50/p95/p99 latency.
+
+Uploads and prompts are unique per request by default so the extraction and
+completion caches stay cold; ``--warm`` reuses one payload per scenario to
+measure the cached path. ``--compare`` diffs p95 and throughput against an
+earlier ``--json`` result and exits 1 if any p95 regressed by more than
+``--max-regression``. The image scenario needs the tesseract binary and is
+skipped without it.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+NOTICE_LINES = [
+    "NOTICE TO PAY RENT OR QUIT",
+    "To: Jane Doe, tenant in possession of the premises at 123 Lakeview Road.",
+    "Rent in the amount of $1,850.00 for June is now due and unpaid.",
+    "You must pay the amount due within three days or vacate the premises,",
+    "or legal proceedings will be instituted against you.",
+]
+
+# name -> (method, path, kind); kind picks the payload builder
+SCENARIOS: Dict[str, Tuple[str, str, str]] = {
+    "case": ("POST", "/api/ai/case", "case"),
+    "upload_pdf": ("POST", "/api/upload/doc", "pdf"),
+    "upload_docx": ("POST", "/api/upload/doc", "docx"),
+    "upload_image": ("POST", "/api/upload/doc", "image"),
+    "upload_txt": ("POST", "/api/upload/doc", "txt"),
+    "doc_generate": ("POST", "/api/doc-generate/doc_generate", "doc_generate"),
+}
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _pdf_bytes(lines: List[str]) -> bytes:
+    """Minimal single-page PDF with a text layer"""
+    text = " ".join(f"({line.replace('(', '').replace(')', '')}) Tj 0 -16 Td" for line in lines)
+    stream = f"BT /F1 11 Tf 72 720 Td {text} ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        "/Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return out
+
+
+def _docx_bytes(lines: List[str]) -> bytes:
+    from docx import Document
+
+    doc = Document()
+    for line in lines:
+        doc.add_paragraph(line)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _image_bytes(lines: List[str]) -> bytes:
+    from PIL import Image, ImageDraw, ImageFont
+
+    image = Image.new("RGB", (1600, 900), (250, 250, 245))
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=32)
+    for row, line in enumerate(lines):
+        draw.text((60, 60 + row * 60), line, fill=(20, 20, 20), font=font)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+FILE_BUILDERS: Dict[str, Tuple[str, Callable[[List[str]], bytes]]] = {
+    "pdf": ("notice.pdf", _pdf_bytes),
+    "docx": ("notice.docx", _docx_bytes),
+    "image": ("notice.png", _image_bytes),
+    "txt": ("notice.txt", lambda lines: "\n".join(lines).encode("utf-8")),
+}
+
+
+def _build_payload(kind: str, nonce: str) -> Dict[str, Any]:
+    """httpx request kwargs for one request; ``nonce`` makes it unique"""
+    if kind == "case":
+        return {"json": {
+            "prompt": f"My landlord kept my $1,500 deposit after I moved out. Ref {nonce}",
+            "legal_profile": {"name": "Jane Doe", "state": "CA", "case_type": "landlord_tenant"},
+        }}
+    if kind == "doc_generate":
+        return {"json": {
+            "document_type": "Demand Letter",
+            "case_summary": "Security deposit withheld without an itemized statement.",
+            "user_details": {
+                "name": "Jane Doe",
+                "address": "123 Lakeview Road, Sacramento, CA",
+                "opposing_party": "Acme Property Management",
+                "facts": f"Moved out on May 31 and left the unit clean. Ref {nonce}",
+            },
+        }}
+    filename, builder = FILE_BUILDERS[kind]
+    content = builder(NOTICE_LINES + [f"Reference {nonce}"])
+    return {"files": {"file": (filename, content)}}
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+async def _run_level(
+    client: httpx.AsyncClient,
+    method: str,
+    path: str,
+    payloads: List[Dict[str, Any]],
+    concurrency: int,
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    queue: asyncio.Queue = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+
+    async def worker():
+        while True:
+            try:
+                payload = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **payload)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "concurrency": concurrency,
+        "requests": len(payloads),
+        "errors": errors,
+        "statuses": statuses,
+        "rps": round(len(payloads) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(1000 * sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "p50_ms": round(1000 * _percentile(latencies, 0.50), 2),
+        "p95_ms": round(1000 * _percentile(latencies, 0.95), 2),
+        "p99_ms": round(1000 * _percentile(latencies, 0.99), 2),
+    }
+
+
+def _start(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, *args], cwd=REPO_ROOT, env=env)
+
+
+async def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(trust_env=False) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{url} exited with code {process.returncode} during startup")
+            try:
+                await client.get(url, timeout=1.0)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+
+async def _benchmark(args, scenarios: List[str], levels: List[int]) -> List[Dict[str, Any]]:
+    workdir = tempfile.mkdtemp(prefix="suepr-bench-")
+    fake_port = _free_port()
+    app_port = _free_port()
+    env = dict(os.environ)
+    env.update({
+        "GROQ_API_KEY": "benchmark",
+        "GROQ_BASE_URL": f"http://127.0.0.1:{fake_port}",
+        "NO_PROXY": "127.0.0.1,localhost",
+        # The fake server has no quota; keep the client-side limiter out of the way
+        "GROQ_REQUESTS_PER_MINUTE": "1000000",
+        "GROQ_TOKENS_PER_MINUTE": "1000000000",
+        "COMPLETION_CACHE_ENABLED": "true" if args.warm else "false",
+        "EXTRACTION_CACHE_DIR": os.path.join(workdir, "extraction"),
+        "JOBS_DB_PATH": os.path.join(workdir, "jobs.sqlite3"),
+        "DOCUMENT_STORE_DIR": os.path.join(workdir, "documents"),
+        "UPLOAD_TEMP_DIR": os.path.join(workdir, "temp"),
+    })
+
+    fake = _start([
+        "-m", "benchmarks.fake_groq",
+        "--port", str(fake_port),
+        "--latency", str(args.fake_latency),
+        "--jitter", str(args.fake_jitter),
+        "--tokens-per-second", str(args.fake_tokens_per_second),
+        "--error-rate", str(args.fake_error_rate),
+        "--seed", "1",
+    ], env)
+    server = None
+    try:
+        await _wait_ready(f"http://127.0.0.1:{fake_port}/stats", fake)
+        server = _start([
+            "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1",
+            "--port", str(app_port),
+            "--log-level", "warning",
+        ], env)
+        await _wait_ready(f"http://127.0.0.1:{app_port}/health", server)
+
+        results = []
+        limits = httpx.Limits(max_connections=max(levels) * 2, max_keepalive_connections=max(levels))
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{app_port}",
+            timeout=args.timeout,
+            limits=limits,
+            trust_env=False,
+        ) as client:
+            for name in scenarios:
+                method, path, kind = SCENARIOS[name]
+                # Build payloads before timing so client-side work is excluded
+                count = args.requests
+                if args.warm:
+                    payloads = [_build_payload(kind, "warm")] * (count * len(levels) + 1)
+                else:
+                    payloads = [_build_payload(kind, f"{name}-{i}") for i in range(count * len(levels) + 1)]
+                # One untimed request so lazy start-up costs are not counted
+                await client.request(method, path, **payloads.pop())
+                for level_index, level in enumerate(levels):
+                    batch = payloads[level_index * count:(level_index + 1) * count]
+                    result = await _run_level(client, method, path, batch, level)
+                    result["scenario"] = name
+                    results.append(result)
+                    print(
+                        f"{name:<14}{level:>6}{result['rps']:>10.2f}{result['p50_ms']:>10.1f}"
+                        f"{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['errors']:>8}"
+                    )
+        return results
+    finally:
+        for process in (server, fake):
+            if process is not None and process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _compare(results: List[Dict[str, Any]], baseline_path: str, max_regression: float) -> bool:
+    """Print changes against a saved run; return False if p95 regressed too far"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {
+            (r["scenario"], r["concurrency"]): r for r in json.load(f)["results"]
+        }
+    ok = True
+    print(f"\nvs {baseline_path}")
+    print(f"{'scenario':<14}{'conc':>6}{'p95 Δ%':>10}{'rps Δ%':>10}")
+    for result in results:
+        before = baseline.get((result["scenario"], result["concurrency"]))
+        if before is None or not before["p95_ms"] or not before["rps"]:
+            continue
+        p95_change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"]
+        rps_change = (result["rps"] - before["rps"]) / before["rps"]
+        flag = ""
+        if p95_change > max_regression:
+            ok = False
+            flag = "  REGRESSION"
+        print(f"{result['scenario']:<14}{result['concurrency']:>6}{100 * p95_change:>10.1f}{100 * rps_change:>10.1f}{flag}")
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated scenario names")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=40, help="requests per scenario and level")
+    parser.add_argument("--warm", action="store_true", help="repeat one payload so caches are hit")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout, seconds")
+    parser.add_argument("--fake-latency", type=float, default=0.2)
+    parser.add_argument("--fake-jitter", type=float, default=0.05)
+    parser.add_argument("--fake-tokens-per-second", type=float, default=800.0)
+    parser.add_argument("--fake-error-rate", type=float, default=0.0)
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    parser.add_argument("--compare", help="earlier --json output to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed p95 increase, as a fraction")
+    args = parser.parse_args(argv)
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    if "upload_image" in scenarios and shutil.which("tesseract") is None:
+        print("tesseract not found; skipping upload_image", file=sys.stderr)
+        scenarios.remove("upload_image")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    print(f"{'scenario':<14}{'conc':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    results = asyncio.run(_benchmark(args, scenarios, levels))
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "config": {
+                    "requests": args.requests,
+                    "warm": args.warm,
+                    "fake_latency": args.fake_latency,
+                    "fake_jitter": args.fake_jitter,
+                    "fake_tokens_per_second": args.fake_tokens_per_second,
+                    "fake_error_rate": args.fake_error_rate,
+                },
+                "results": results,
+            }, f, indent=2)
+
+    if args.compare and not _compare(results, args.compare, args.max_regression):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+# benchmarks/ocr_benchmark.py
+"""Compare the raw pytesseract path against the normalized OCR pipeline.
+
+Usage:
+    python -m benchmarks.ocr_benchmark [--images DIR] [--runs N] [--json OUT]
+
+With ``--images`` every image in DIR is used; a sibling ``<name>.txt`` holds
+its expected text for the accuracy column. Without it, synthetic phone-photo
+sized pages with known text are generated. The baseline needs the tesseract
+binary and is skipped without it; with tesserocr installed, a "per-call" row
+loads a fresh recognizer for every image, which is what the persistent
+engine saves.
+"""
+import argparse
+import difflib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+import pytesseract
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from app.core.config import settings
+from app.services.shared.ocr import load_tesserocr, normalize_image, ocr_image_bytes, warm_up
+
+tesserocr = load_tesserocr()
+
+SAMPLE_TEXT = [
+    "NOTICE TO PAY RENT OR QUIT",
+    "To: Jane Doe, tenant in possession of the premises",
+    "at 123 Lakeview Road, Apartment 4B, Sacramento, California.",
+    "You are hereby notified that rent in the amount of $1,850.00",
+    "for the period of June 1 through June 30 is now due.",
+    "You must pay the amount due within three days or vacate",
+    "the premises, or legal proceedings will be instituted.",
+]
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".tif")
+
+
+def _synthetic_samples() -> List[Tuple[str, bytes, str]]:
+    """Render known text onto 12 MP grey, slightly blurred 'photos'"""
+    samples = []
+    font = ImageFont.load_default(size=72)
+    for name, size in (("photo_12mp", (4032, 3024)), ("photo_portrait", (3024, 4032))):
+        image = Image.new("RGB", size, (214, 208, 196))
+        draw = ImageDraw.Draw(image)
+        y = 300
+        for line in SAMPLE_TEXT:
+            draw.text((250, y), line, fill=(40, 40, 48), font=font)
+            y += 130
+        image = image.filter(ImageFilter.GaussianBlur(1.2))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=90)
+        samples.append((name, buffer.getvalue(), "\n".join(SAMPLE_TEXT)))
+    return samples
+
+
+def _directory_samples(directory: str) -> List[Tuple[str, bytes, Optional[str]]]:
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        path = os.path.join(directory, name)
+        with open(path, "rb") as f:
+            data = f.read()
+        truth_path = os.path.splitext(path)[0] + ".txt"
+        truth = None
+        if os.path.exists(truth_path):
+            with open(truth_path, encoding="utf-8") as f:
+                truth = f.read()
+        samples.append((name, data, truth))
+    return samples
+
+
+def _baseline(data: bytes) -> str:
+    """The original FileUtils.extract_text_from_image behaviour"""
+    return pytesseract.image_to_string(Image.open(io.BytesIO(data))).strip()
+
+
+def _per_call(data: bytes) -> str:
+    """The normalized pipeline, loading the language model for every image"""
+    with tesserocr.PyTessBaseAPI(lang=settings.OCR_LANG) as api:
+        api.SetImage(normalize_image(Image.open(io.BytesIO(data))))
+        return api.GetUTF8Text().strip()
+
+
+def _paths() -> List[Tuple[str, object]]:
+    paths: List[Tuple[str, object]] = []
+    try:
+        pytesseract.get_tesseract_version()
+        paths.append(("baseline", _baseline))
+    except pytesseract.TesseractNotFoundError:
+        print("tesseract binary not found; skipping the baseline", file=sys.stderr)
+    if tesserocr is not None:
+        paths.append(("per-call", _per_call))
+    paths.append(("pipeline", ocr_image_bytes))
+    return paths
+
+
+def _accuracy(text: str, truth: Optional[str]) -> Optional[float]:
+    if truth is None:
+        return None
+    return difflib.SequenceMatcher(None, text.split(), truth.split()).ratio()
+
+
+def _measure(func, data: bytes, runs: int) -> Tuple[List[float], str]:
+    timings = []
+    text = ""
+    for _ in range(runs):
+        start = time.perf_counter()
+        text = func(data)
+        timings.append(time.perf_counter() - start)
+    return timings, text
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", help="directory of sample images")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    samples = _directory_samples(args.images) if args.images else _synthetic_samples()
+    if not samples:
+        print("No sample images found", file=sys.stderr)
+        return 1
+
+    engine = warm_up()
+    paths = _paths()
+    results: List[Dict[str, object]] = []
+    print(f"OCR engine: {engine}")
+    print(f"{'sample':<24}{'path':<12}{'median s':>10}{'accuracy':>10}")
+    for name, data, truth in samples:
+        for label, func in paths:
+            timings, text = _measure(func, data, args.runs)
+            accuracy = _accuracy(text, truth)
+            median = statistics.median(timings)
+            results.append({
+                "sample": name,
+                "path": label,
+                "median_seconds": round(median, 4),
+                "timings": [round(t, 4) for t in timings],
+                "accuracy": None if accuracy is None else round(accuracy, 4),
+            })
+            shown = "-" if accuracy is None else f"{accuracy:.3f}"
+            print(f"{name:<24}{label:<12}{median:>10.3f}{shown:>10}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"engine": engine, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,101 @@
 # main.py
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager
 import os
 
 from app.core.config import settings
 from app.services.ai_case.ai_case_route import router as ai_case_router
 from app.services.doc_upload.doc_upload_route import router as doc_upload_router
-from app.services.doc_generate.doc_generate_route import router as doc_generate_router
+from app.services.doc_generate.doc_generate_route import router as doc_generate_router, legacy_router as legacy_uploads_router
+from app.services.jobs.jobs_route import router as jobs_router
+from app.services.jobs.jobs_service import job_queue
+from app.services.shared.groq_client import GroqClient
+from app.services.shared.executor import execution_engine
+from app.services.shared.extraction_cache import extraction_cache
+from app.services.shared.completion_cache import completion_cache
+from app.services.shared.document_store import document_store
+from app.services.shared.case_store import case_store
+from app.services.shared.retrieval import case_indexes
+from app.services.shared.model_router import model_router
+from app.services.shared.ingest import UploadSizeLimitMiddleware
+from app.services.shared.admission import admission_controller, AdmissionMiddleware
+from app.services.shared.rate_limiter import rate_limiter
+from app.services.shared.metrics import metrics, MetricsMiddleware, PROMETHEUS_CONTENT_TYPE
+from app.services.shared.responses import FastJSONResponse, CompressionMiddleware
+from app.services.shared.warmup import warm_up
+from app.services.shared.structured_output import structured_output_stats
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Settings are first read here, not at import
+    app.title = settings.APP_NAME
+    # Create upload directories. Generated documents are served by the
+    # document store's download route; uploads/ itself is not public.
+    os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+    execution_engine.startup()
+    # Load the lazily imported SDK, parsers, OCR engine and DOCX bases (as
+    # configured for this deployment) before the first request arrives
+    await warm_up.run()
+    await job_queue.startup()
+    document_store.startup()
+    try:
+        yield
+    finally:
+        await document_store.shutdown()
+        # Requests have drained by now; give running jobs their own deadline
+        await job_queue.shutdown(settings.JOBS_DRAIN_TIMEOUT)
+        execution_engine.shutdown()
+        case_store.close()
+        await GroqClient.shutdown()
 
 
 app = FastAPI(
-    title=settings.APP_NAME,
+    title="SUEPR Legal AI",
     description="SUEPR Legal AI - Comprehensive Legal Assistant API",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
+# Middleware is built on the first ASGI call (the lifespan startup), so
+# these factories read settings then rather than at import
+
+def admission_middleware(app):
+    if not settings.ADMISSION_ENABLED:
+        return app
+    return AdmissionMiddleware(app, controller=admission_controller)
+
+def upload_size_limit_middleware(app):
+    return UploadSizeLimitMiddleware(
+        app,
+        limits={
+            "/api/upload/batch": settings.MAX_FILE_SIZE * settings.BATCH_MAX_FILES,
+            "/api/upload": settings.MAX_FILE_SIZE,
+            "/api/jobs/doc": settings.MAX_FILE_SIZE,
+        },
+    )
+
+def compression_middleware(app):
+    if not settings.COMPRESSION_ENABLED:
+        return app
+    return CompressionMiddleware(
+        app,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+
+def metrics_middleware(app):
+    return MetricsMiddleware(app) if settings.METRICS_ENABLED else app
+
+# Innermost, so CORS preflights are never queued and refusals carry CORS headers
+app.add_middleware(admission_middleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -27,24 +105,99 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create upload directories
-os.makedirs("uploads/temp", exist_ok=True)
+# Refuse oversize uploads before the multipart body is spooled
+app.add_middleware(upload_size_limit_middleware)
+
+# Compress JSON and NDJSON bodies; event streams pass through unbuffered
+app.add_middleware(compression_middleware)
+
+# Outermost, so rejected uploads and CORS preflights are timed too
+app.add_middleware(metrics_middleware)
 
-# Mount static files
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Component counters are read from their stats() at scrape time (the
+# lambdas keep the lazily built components unbuilt until then)
+metrics.register_stats("executor", execution_engine.stats)
+metrics.register_stats(
+    "extraction_cache", lambda: extraction_cache.stats(),
+    counters=("memory_hits", "disk_hits", "misses"),
+)
+metrics.register_stats(
+    "completion_cache", lambda: completion_cache.stats(),
+    counters=("hits", "misses", "coalesced"),
+)
+metrics.register_stats(
+    "document_store", lambda: document_store.stats(),
+    counters=("stored", "deduplicated", "expired", "evicted", "temp_removed"),
+)
+metrics.register_stats("case_store", lambda: case_store.stats(), counters=("memory_hits", "disk_hits", "misses"))
+metrics.register_stats("retrieval", lambda: case_indexes.stats())
+metrics.register_stats(
+    "admission", admission_controller.stats,
+    counters=("admitted", "queued", "rejected", "timed_out"),
+)
+metrics.register_stats("jobs", lambda: job_queue.stats(), counters=("completed",))
+metrics.register_stats(
+    "llm_rate_limiter", lambda: rate_limiter.stats(),
+    counters=("throttled", "rate_limited", "retries"),
+)
+metrics.register_stats(
+    "model_router", model_router.stats,
+    counters=("calls", "fallbacks", "slow", "rate_limited", "error"),
+)
+metrics.register_stats(
+    "structured_output", structured_output_stats.stats,
+    counters=("clean", "repaired", "rerequested", "failed", "responses"),
+)
 
 # Include routers
 app.include_router(ai_case_router, prefix="/api/ai", tags=["AI Case Services"])
 app.include_router(doc_upload_router, prefix="/api/upload", tags=["Document Upload"])
 app.include_router(doc_generate_router, prefix="/api/doc-generate", tags=["Document Generation"])
+app.include_router(jobs_router, prefix="/api/jobs", tags=["Background Jobs"])
+app.include_router(legacy_uploads_router)
 
 @app.get("/")
 async def root():
     return {"message": "SUEPR Legal AI API is running", "version": "1.0.0"}
 
+@app.get("/live", include_in_schema=False)
+async def liveness_check():
+    """Liveness probe: 200 whenever the process can serve requests, however busy"""
+    return FastJSONResponse(content={"status": "alive"})
+
+@app.get("/ready", include_in_schema=False)
+async def readiness_check():
+    """Readiness probe: a 503 while saturated tells the load balancer to send new work elsewhere"""
+    saturated = settings.ADMISSION_ENABLED and admission_controller.saturated
+    return FastJSONResponse(
+        status_code=503 if saturated else 200,
+        content={"status": "saturated" if saturated else "ready"},
+    )
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "suepr-legal-ai"}
+    saturated = settings.ADMISSION_ENABLED and admission_controller.saturated
+    return FastJSONResponse(content={
+        "status": "saturated" if saturated else "healthy",
+        "service": "suepr-legal-ai",
+        "admission": admission_controller.stats(),
+        "warm_up": warm_up.stats(),
+        "executors": execution_engine.stats(),
+        "extraction_cache": extraction_cache.stats(),
+        "completion_cache": completion_cache.stats(),
+        "document_store": document_store.stats(),
+        "case_store": case_store.stats(),
+        "retrieval": case_indexes.stats(),
+        "jobs": job_queue.stats(),
+        "llm_rate_limiter": rate_limiter.stats(),
+        "model_router": model_router.stats(),
+        "structured_output": structured_output_stats.stats(),
+    })
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    return Response(content=metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 if __name__ == "__main__":
     import uvicorn